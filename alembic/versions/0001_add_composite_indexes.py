@@ -0,0 +1,72 @@
+"""add composite indexes for membership and planning week lookups
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Earliest week of each (household_id, week_start) pair
+KEEPER_WEEK_ID = (
+    "(SELECT MIN(k.id) FROM planning_weeks k JOIN planning_weeks w"
+    " ON k.household_id = w.household_id AND k.week_start = w.week_start"
+    " WHERE w.id = {table}.planning_week_id)"
+)
+KEEPER_WEEK_IDS = "SELECT MIN(id) FROM planning_weeks GROUP BY household_id, week_start"
+
+
+def _merge_duplicate_planning_weeks() -> None:
+    """Fold weeks created twice for the same date into the earliest one."""
+    # A settlement whose (week, payer, payee) key would collide after
+    # repointing is dropped in favour of the one on the earlier week
+    op.execute(
+        "DELETE FROM settlements WHERE EXISTS ("
+        "SELECT 1 FROM settlements s2"
+        " JOIN planning_weeks w2 ON w2.id = s2.planning_week_id"
+        " JOIN planning_weeks w ON w.household_id = w2.household_id AND w.week_start = w2.week_start"
+        " WHERE w.id = settlements.planning_week_id"
+        " AND s2.payer_id = settlements.payer_id AND s2.payee_id = settlements.payee_id"
+        " AND s2.planning_week_id < settlements.planning_week_id)"
+    )
+    for table in ('week_recipes', 'shopping_items', 'settlements'):
+        op.execute(
+            f"UPDATE {table} SET planning_week_id = {KEEPER_WEEK_ID.format(table=table)}"
+            f" WHERE planning_week_id NOT IN ({KEEPER_WEEK_IDS})"
+        )
+    op.execute(f"DELETE FROM planning_weeks WHERE id NOT IN ({KEEPER_WEEK_IDS})")
+
+
+def upgrade() -> None:
+    # Tables built by Base.metadata.create_all already carry these indexes, and
+    # tables it hasn't built yet will get them when it does; only older
+    # schemas need them added
+    inspector = sa.inspect(op.get_bind())
+
+    def needs_index(name: str, table: str) -> bool:
+        return inspector.has_table(table) and name not in {
+            ix['name'] for ix in inspector.get_indexes(table)
+        }
+
+    if needs_index('ix_household_user_user_hh', 'household_users'):
+        op.create_index('ix_household_user_user_hh', 'household_users', ['user_id', 'household_id'], unique=False)
+    if needs_index('ix_planning_week_hh_start', 'planning_weeks'):
+        _merge_duplicate_planning_weeks()
+        op.create_index('ix_planning_week_hh_start', 'planning_weeks', ['household_id', 'week_start'], unique=True)
+    if needs_index('ix_receipt_line_receipt', 'receipt_lines'):
+        op.create_index('ix_receipt_line_receipt', 'receipt_lines', ['receipt_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_receipt_line_receipt', table_name='receipt_lines')
+    op.drop_index('ix_planning_week_hh_start', table_name='planning_weeks')
+    op.drop_index('ix_household_user_user_hh', table_name='household_users')
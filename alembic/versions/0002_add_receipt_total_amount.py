@@ -0,0 +1,35 @@
+"""add stored total_amount to receipts
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables built by Base.metadata.create_all already have the column
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('receipts') or 'total_amount' in {
+        column['name'] for column in inspector.get_columns('receipts')
+    }:
+        return
+
+    op.add_column('receipts', sa.Column('total_amount', sa.Float(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE receipts SET total_amount = COALESCE("
+        "(SELECT SUM(line_price) FROM receipt_lines WHERE receipt_lines.receipt_id = receipts.id), 0)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('receipts', 'total_amount')
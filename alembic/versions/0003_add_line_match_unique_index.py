@@ -0,0 +1,36 @@
+"""add unique index on line_matches (receipt_line_id, recipe_ingredient_id)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables built by Base.metadata.create_all already have the index
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('line_matches') or 'ix_line_match_line_ingredient' in {
+        ix['name'] for ix in inspector.get_indexes('line_matches')
+    }:
+        return
+
+    # Keep the earliest match for any pairing confirmed more than once
+    op.execute(
+        "DELETE FROM line_matches WHERE id NOT IN ("
+        "SELECT MIN(id) FROM line_matches GROUP BY receipt_line_id, recipe_ingredient_id)"
+    )
+    op.create_index('ix_line_match_line_ingredient', 'line_matches', ['receipt_line_id', 'recipe_ingredient_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_line_match_line_ingredient', table_name='line_matches')
@@ -0,0 +1,49 @@
+"""add indexes on foreign key columns used in filters and joins
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_receipts_household_id', 'receipts', ['household_id']),
+    ('ix_receipts_payer_id', 'receipts', ['payer_id']),
+    ('ix_line_matches_recipe_ingredient_id', 'line_matches', ['recipe_ingredient_id']),
+    ('ix_week_recipes_planning_week_id', 'week_recipes', ['planning_week_id']),
+    ('ix_week_recipes_recipe_id', 'week_recipes', ['recipe_id']),
+    ('ix_shopping_items_planning_week_id', 'shopping_items', ['planning_week_id']),
+    ('ix_shopping_item_links_recipe_ingredient_id', 'shopping_item_links', ['recipe_ingredient_id']),
+    ('ix_ingredient_synonyms_ingredient_id', 'ingredient_synonyms', ['ingredient_id']),
+]
+
+
+def upgrade() -> None:
+    # Tables built by Base.metadata.create_all already have these indexes
+    inspector = sa.inspect(op.get_bind())
+    missing = [
+        (name, table, columns) for name, table, columns in INDEXES
+        if inspector.has_table(table)
+        and name not in {ix['name'] for ix in inspector.get_indexes(table)}
+    ]
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in missing:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
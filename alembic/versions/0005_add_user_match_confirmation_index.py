@@ -0,0 +1,40 @@
+"""add composite index on user_match_confirmations (normalized_text, was_correct)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables built by Base.metadata.create_all already have the index
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('user_match_confirmations') or 'ix_user_match_confirmation_text_correct' in {
+        ix['name'] for ix in inspector.get_indexes('user_match_confirmations')
+    }:
+        return
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_match_confirmation_text_correct', 'user_match_confirmations',
+            ['normalized_text', 'was_correct'], unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_match_confirmation_text_correct', table_name='user_match_confirmations',
+            postgresql_concurrently=True
+        )
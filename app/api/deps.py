@@ -1,21 +1,52 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from typing import Optional, Sequence, Tuple
+from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy import select, bindparam, exists, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload, raiseload
 
 from app.core.database import get_db
 from app.core.security import verify_token
+from app.core.ttl_cache import TTLCache
 from app.models.user import User
+from app.models.household import HouseholdUser
+from app.models.planning import PlanningWeek
+from app.models.receipt import Receipt, ReceiptLine
+from app.models.settlement import SplitwiseLink
 
-security = HTTPBearer()
+# Statements run on (nearly) every request, built once at import
+USER_BY_ID_STMT = select(User).where(User.id == bindparam("user_id"))
+USER_WITH_SPLITWISE_LINK_STMT = USER_BY_ID_STMT.options(
+    joinedload(User.splitwise_link.of_type(SplitwiseLink))
+)
+MEMBERSHIP_STMT = select(
+    exists().where(
+        HouseholdUser.household_id == bindparam("household_id"),
+        HouseholdUser.user_id == bindparam("user_id")
+    )
+)
 
+# Confirmed memberships, remembered briefly per process. Only positives are
+# cached: joining takes effect at once, and the API never removes members
+MEMBERSHIP_CACHE_MAXSIZE = 10_000
+MEMBERSHIP_CACHE_TTL = 60
+_membership_cache: TTLCache[Tuple[int, int], bool] = TTLCache(
+    MEMBERSHIP_CACHE_MAXSIZE, MEMBERSHIP_CACHE_TTL
+)
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
-    """Get the current authenticated user."""
-    token = credentials.credentials
+
+async def bearer_token(authorization: Optional[str] = Header(None)) -> str:
+    """Extract the token from an `Authorization: Bearer <token>` header."""
+    if not authorization or authorization[:7].lower() != "bearer ":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return authorization[7:]
+
+
+async def _load_current_user(db: AsyncSession, token: str, stmt) -> User:
+    """Resolve the bearer token's user with the given statement."""
     user_id = verify_token(token, token_type="access")
 
     if user_id is None:
@@ -25,7 +56,8 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(stmt, {"user_id": int(user_id)})
+    user = result.scalar_one_or_none()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,8 +73,106 @@ def get_current_user(
     return user
 
 
-def get_current_active_user(
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(bearer_token)
+) -> User:
+    """Get the current authenticated user."""
+    return await _load_current_user(db, token, USER_BY_ID_STMT)
+
+
+async def get_current_user_with_splitwise_link(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(bearer_token)
+) -> User:
+    """Get the current user with their Splitwise link joined in the same query."""
+    return await _load_current_user(db, token, USER_WITH_SPLITWISE_LINK_STMT)
+
+
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
     """Get the current active user (alias for get_current_user)."""
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def is_household_member(db: AsyncSession, household_id: int, user_id: int) -> bool:
+    """Check household membership with a single EXISTS probe (cached for a short TTL)."""
+    key = (household_id, user_id)
+    if _membership_cache.get(key):
+        return True
+
+    is_member = bool(await db.scalar(
+        MEMBERSHIP_STMT,
+        {"household_id": household_id, "user_id": user_id}
+    ))
+    if is_member:
+        _membership_cache.set(key, True)
+    return is_member
+
+
+def _with_membership(stmt, household_id_column, user_id: int):
+    """Add the user's membership of the row's household as an extra column."""
+    return stmt.add_columns(HouseholdUser.user_id).outerjoin(
+        HouseholdUser,
+        and_(
+            HouseholdUser.household_id == household_id_column,
+            HouseholdUser.user_id == user_id
+        )
+    )
+
+
+async def _load_authorized(db: AsyncSession, stmt, not_found_detail: str):
+    """Run an entity + membership query, raising 404 or 403 as appropriate."""
+    row = (await db.execute(stmt)).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found_detail
+        )
+
+    entity, member_id = row
+    if member_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this household"
+        )
+    return entity
+
+
+async def authorize_receipt(
+    db: AsyncSession, receipt_id: int, user_id: int, options: Sequence = ()
+) -> Receipt:
+    """Load a receipt from one of the user's households in a single query."""
+    stmt = _with_membership(
+        select(Receipt).options(*options, raiseload("*")),
+        Receipt.household_id,
+        user_id
+    ).where(Receipt.id == receipt_id)
+    return await _load_authorized(db, stmt, "Receipt not found")
+
+
+async def authorize_receipt_line(
+    db: AsyncSession, receipt_line_id: int, user_id: int
+) -> ReceiptLine:
+    """Load a receipt line (with its receipt) from one of the user's households."""
+    stmt = _with_membership(
+        select(ReceiptLine)
+        .join(ReceiptLine.receipt)
+        .options(contains_eager(ReceiptLine.receipt)),
+        Receipt.household_id,
+        user_id
+    ).where(ReceiptLine.id == receipt_line_id)
+    return await _load_authorized(db, stmt, "Receipt line not found")
+
+
+async def authorize_planning_week(
+    db: AsyncSession, week_id: int, user_id: int, options: Sequence = ()
+) -> PlanningWeek:
+    """Load a planning week from one of the user's households in a single query."""
+    stmt = _with_membership(
+        select(PlanningWeek).options(*options, raiseload("*")),
+        PlanningWeek.household_id,
+        user_id
+    ).where(PlanningWeek.id == week_id)
+    return await _load_authorized(db, stmt, "Planning week not found")
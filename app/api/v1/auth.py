@@ -1,68 +1,82 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, dialect_insert
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
+    DUMMY_HASH,
     create_access_token,
     create_refresh_token,
     verify_token
 )
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, Token, User as UserSchema
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, bearer_token, USER_BY_ID_STMT
 
 router = APIRouter()
-security = HTTPBearer()
+
+USER_BY_EMAIL_STMT = select(User).where(User.email == bindparam("email"))
+
+
+def _token_response(user_id: int) -> ORJSONResponse:
+    """Mint an access/refresh token pair for a user."""
+    # Returned as a Response so FastAPI doesn't re-validate data we just built
+    return ORJSONResponse({
+        "access_token": create_access_token(subject=user_id),
+        "refresh_token": create_refresh_token(subject=user_id),
+        "token_type": "bearer"
+    })
 
 
 @router.post("/signup", response_model=Token)
-def signup(
+async def signup(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user."""
-    # Check if user already exists
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if user:
+    hashed_password = await get_password_hash_async(user_in.password)
+
+    # Insert unless the email is taken; the unique index makes this atomic
+    result = await db.execute(
+        dialect_insert(User)
+        .values(
+            email=user_in.email,
+            display_name=user_in.display_name,
+            hashed_password=hashed_password
+        )
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.id)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    await db.commit()
 
-    # Create new user
-    hashed_password = get_password_hash(user_in.password)
-    db_user = User(
-        email=user_in.email,
-        display_name=user_in.display_name,
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    # Create tokens
-    access_token = create_access_token(subject=db_user.id)
-    refresh_token = create_refresh_token(subject=db_user.id)
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return _token_response(user_id)
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Authenticate and login a user."""
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    result = await db.execute(USER_BY_EMAIL_STMT, {"email": user_credentials.email})
+    user = result.scalar_one_or_none()
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    # Always hash, even for unknown emails, to keep timing uniform
+    valid = await verify_password_async(
+        user_credentials.password,
+        user.hashed_password if user else DUMMY_HASH
+    )
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -74,23 +88,20 @@ def login(
             detail="Inactive user"
         )
 
-    access_token = create_access_token(subject=user.id)
-    refresh_token = create_refresh_token(subject=user.id)
+    # Upgrade legacy bcrypt hashes to Argon2id
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(user_credentials.password)
+        await db.commit()
 
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return _token_response(user.id)
 
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+async def refresh_token(
+    token: str = Depends(bearer_token),
+    db: AsyncSession = Depends(get_db)
 ):
     """Refresh an access token using a refresh token."""
-    token = credentials.credentials
     user_id = verify_token(token, token_type="refresh")
 
     if user_id is None:
@@ -99,25 +110,19 @@ def refresh_token(
             detail="Invalid refresh token"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(USER_BY_ID_STMT, {"user_id": int(user_id)})
+    user = result.scalar_one_or_none()
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
 
-    access_token = create_access_token(subject=user.id)
-    refresh_token = create_refresh_token(subject=user.id)
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return _token_response(user.id)
 
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user_info(
+async def get_current_user_info(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user information."""
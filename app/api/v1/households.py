@@ -1,8 +1,11 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.database import get_db
+from app.core.database import get_db, dialect_insert
 from app.models.user import User
 from app.models.household import Household, HouseholdUser
 from app.schemas.household import (
@@ -15,52 +18,73 @@ from app.api.deps import get_current_user
 router = APIRouter()
 
 
+def _household_query():
+    """Select households with the members needed by the response schema."""
+    return select(Household).options(
+        selectinload(Household.members).options(
+            selectinload(HouseholdUser.user).raiseload("*"),
+            raiseload("*")
+        ),
+        raiseload("*")
+    )
+
+
 @router.post("/", response_model=HouseholdSchema)
-def create_household(
+async def create_household(
     household_in: HouseholdCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new household."""
     # Create household
     db_household = Household(name=household_in.name)
     db.add(db_household)
-    db.commit()
-    db.refresh(db_household)
+    await db.flush()
 
-    # Add creator as household member
+    # Add creator as household member in the same transaction
     household_user = HouseholdUser(
         household_id=db_household.id,
         user_id=current_user.id,
         share_default=1.0
     )
     db.add(household_user)
-    db.commit()
+    await db.commit()
 
+    # created_at came back via RETURNING; the only member is the creator
+    set_committed_value(household_user, "user", current_user)
+    set_committed_value(db_household, "members", [household_user])
     return db_household
 
 
 @router.get("/{household_id}", response_model=HouseholdSchema)
-def get_household(
+async def get_household(
     household_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get household details."""
-    household = db.query(Household).filter(Household.id == household_id).first()
-    if not household:
+    # Load household and the caller's membership in one round-trip
+    result = await db.execute(
+        _household_query()
+        .add_columns(HouseholdUser.user_id)
+        .outerjoin(
+            HouseholdUser,
+            and_(
+                HouseholdUser.household_id == Household.id,
+                HouseholdUser.user_id == current_user.id
+            )
+        )
+        .where(Household.id == household_id)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Household not found"
         )
 
-    # Check if user is a member of this household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
+    household, member_id = row
+    if member_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this household"
@@ -70,51 +94,52 @@ def get_household(
 
 
 @router.post("/{household_id}/join")
-def join_household(
+async def join_household(
     household_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Join an existing household."""
-    household = db.query(Household).filter(Household.id == household_id).first()
+    household = await db.get(Household, household_id, options=[raiseload("*")])
     if not household:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Household not found"
         )
 
-    # Check if user is already a member
-    existing_membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if existing_membership:
+    # Add user to household unless already a member
+    result = await db.execute(
+        dialect_insert(HouseholdUser)
+        .values(
+            household_id=household_id,
+            user_id=current_user.id,
+            share_default=1.0
+        )
+        .on_conflict_do_nothing(index_elements=["household_id", "user_id"])
+        .returning(HouseholdUser.user_id)
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already a member of this household"
         )
-
-    # Add user to household
-    household_user = HouseholdUser(
-        household_id=household_id,
-        user_id=current_user.id,
-        share_default=1.0
-    )
-    db.add(household_user)
-    db.commit()
+    await db.commit()
 
     return {"message": "Successfully joined household"}
 
 
 @router.get("/", response_model=List[HouseholdSchema])
-def get_user_households(
-    db: Session = Depends(get_db),
+async def get_user_households(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all households the current user is a member of."""
-    households = db.query(Household).join(HouseholdUser).filter(
+    # Resolve ids from the membership PK, then fetch households by PK
+    household_ids = select(HouseholdUser.household_id).where(
         HouseholdUser.user_id == current_user.id
-    ).all()
+    )
+    result = await db.execute(
+        _household_query().where(Household.id.in_(household_ids))
+    )
 
-    return households
\ No newline at end of file
+    return result.scalars().all()
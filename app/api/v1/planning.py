@@ -1,12 +1,15 @@
 from typing import List, Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.database import get_db
+from app.core.database import get_db, dialect_insert
 from app.models.user import User
-from app.models.household import HouseholdUser
-from app.models.planning import PlanningWeek, WeekRecipe, ShoppingItem
+from app.models.planning import PlanningWeek, WeekRecipe, Recipe, ShoppingItem
 from app.schemas.planning import (
     PlanningWeekCreate,
     PlanningWeek as PlanningWeekSchema,
@@ -14,106 +17,89 @@ from app.schemas.planning import (
     WeekRecipe as WeekRecipeSchema,
     ShoppingList
 )
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, is_household_member, authorize_planning_week
+from app.services.advanced_matching_service import invalidate_week_ingredients
 
 router = APIRouter()
 
 
 @router.get("/weeks", response_model=List[PlanningWeekSchema])
-def get_planning_weeks(
+async def get_planning_weeks(
     household_id: int = Query(...),
     start: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get planning weeks for a household."""
     # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
+    if not await is_household_member(db, household_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this household"
         )
 
-    query = db.query(PlanningWeek).filter(PlanningWeek.household_id == household_id)
+    query = (
+        select(PlanningWeek)
+        .options(
+            selectinload(PlanningWeek.week_recipes)
+            .selectinload(WeekRecipe.recipe)
+            .selectinload(Recipe.ingredients),
+            raiseload("*")
+        )
+        .where(PlanningWeek.household_id == household_id)
+    )
 
     if start:
-        query = query.filter(PlanningWeek.week_start >= start)
+        query = query.where(PlanningWeek.week_start >= start)
 
-    weeks = query.order_by(PlanningWeek.week_start).all()
-    return weeks
+    result = await db.execute(query.order_by(PlanningWeek.week_start))
+    return result.scalars().all()
 
 
 @router.post("/weeks", response_model=PlanningWeekSchema)
-def create_planning_week(
+async def create_planning_week(
     week_in: PlanningWeekCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new planning week."""
     # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week_in.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
+    if not await is_household_member(db, week_in.household_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this household"
         )
 
-    # Check if week already exists
-    existing_week = db.query(PlanningWeek).filter(
-        PlanningWeek.household_id == week_in.household_id,
-        PlanningWeek.week_start == week_in.week_start
-    ).first()
+    # Create the week unless one already exists for this date
+    result = await db.execute(
+        dialect_insert(PlanningWeek)
+        .values(**week_in.dict())
+        .on_conflict_do_nothing(index_elements=["household_id", "week_start"])
+        .returning(PlanningWeek)
+    )
+    db_week = result.scalar_one_or_none()
 
-    if existing_week:
+    if db_week is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Planning week already exists for this date"
         )
-
-    db_week = PlanningWeek(**week_in.dict())
-    db.add(db_week)
-    db.commit()
-    db.refresh(db_week)
+    await db.commit()
+    # A new week has no recipes; no need to SELECT for them
+    set_committed_value(db_week, "week_recipes", [])
 
     return db_week
 
 
 @router.post("/weeks/{week_id}/recipes", response_model=WeekRecipeSchema)
-def add_recipe_to_week(
+async def add_recipe_to_week(
     week_id: int,
     recipe_in: WeekRecipeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Add a recipe to a planning week."""
-    # Get planning week
-    week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-    if not week:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Planning week not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    await authorize_planning_week(db, week_id, current_user.id)
 
     # Add recipe to week
     week_recipe = WeekRecipe(
@@ -122,45 +108,45 @@ def add_recipe_to_week(
         planned_servings=recipe_in.planned_servings
     )
     db.add(week_recipe)
-    db.commit()
-    db.refresh(week_recipe)
+    await db.commit()
+    invalidate_week_ingredients(week_id)
 
-    return week_recipe
+    result = await db.execute(
+        select(WeekRecipe)
+        .options(selectinload(WeekRecipe.recipe).selectinload(Recipe.ingredients))
+        .where(WeekRecipe.id == week_recipe.id)
+    )
+    return result.scalar_one()
 
 
 @router.get("/weeks/{week_id}/shopping-list", response_model=ShoppingList)
-def get_shopping_list(
+async def get_shopping_list(
     week_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get shopping list for a planning week."""
-    # Get planning week
-    week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-    if not week:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Planning week not found"
+    await authorize_planning_week(db, week_id, current_user.id)
+
+    # Sum quantities per ingredient and unit in SQL
+    result = await db.execute(
+        select(
+            func.min(ShoppingItem.id).label("id"),
+            ShoppingItem.planning_week_id,
+            ShoppingItem.canonical_name,
+            func.sum(ShoppingItem.qty_needed).label("qty_needed"),
+            ShoppingItem.unit
         )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
+        .where(ShoppingItem.planning_week_id == week_id)
+        .group_by(
+            ShoppingItem.planning_week_id,
+            ShoppingItem.canonical_name,
+            ShoppingItem.unit
         )
+        .order_by(ShoppingItem.canonical_name)
+    )
 
-    # Get shopping items
-    shopping_items = db.query(ShoppingItem).filter(
-        ShoppingItem.planning_week_id == week_id
-    ).all()
-
-    return {
+    return ORJSONResponse({
         "planning_week_id": week_id,
-        "items": shopping_items
-    }
\ No newline at end of file
+        "items": [dict(row) for row in result.mappings()]
+    })
@@ -1,11 +1,18 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, func, case, distinct, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime, timedelta
 import os
 import asyncio
+import aiofiles
+import aiofiles.os
+from kombu.exceptions import OperationalError
 
-from app.core.database import get_db
+from app.core.database import get_db, dialect_insert, SessionLocal
 from app.core.config import settings
 from app.models.user import User
 from app.models.household import HouseholdUser
@@ -16,13 +23,43 @@ from app.schemas.receipt import (
     MatchConfirmation,
     PendingMatches
 )
-from app.api.deps import get_current_user
-from app.workers.ocr_worker import OCRWorker
+from app.api.deps import (
+    get_current_user,
+    is_household_member,
+    authorize_receipt,
+    authorize_receipt_line,
+    authorize_planning_week
+)
+from app.workers.tasks import enqueue_receipt_processing
 from app.services.matching_service import MatchingService
 from app.services.advanced_matching_service import AdvancedMatchingService
 
 router = APIRouter()
 
+# Caps matcher calls running concurrently (each holds a DB session while
+# waiting on Gemini); GeminiService enforces the request rate itself
+_gemini_slots = asyncio.Semaphore(settings.GEMINI_MAX_INFLIGHT)
+
+# Caps receipt lines matched in parallel by the plain matcher, so one
+# request can't drain the sync engine's connection pool
+_matcher_slots = asyncio.Semaphore(settings.MATCHER_MAX_CONCURRENCY)
+
+# Uploads are copied to storage this many bytes at a time; 64 KiB keeps
+# per-request memory small without paying per-call overhead on tiny reads
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _call_with_session(fn, *args, **kwargs):
+    """Call a sync service method with its own session; meant for the threadpool."""
+    with SessionLocal() as session:
+        return fn(session, *args, **kwargs)
+
+
+async def _run_matcher(fn, *args, **kwargs):
+    """Run a sync (Gemini-backed) matcher call in the threadpool with its own session."""
+    async with _gemini_slots:
+        return await run_in_threadpool(_call_with_session, fn, *args, **kwargs)
+
 
 @router.post("/", response_model=ReceiptSchema)
 async def upload_receipt(
@@ -30,18 +67,12 @@ async def upload_receipt(
     household_id: int = Form(...),
     store_name: str | None = Form(None),
     purchased_at: datetime | None = Form(None),
-    background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Upload a new receipt for OCR processing."""
     # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
+    if not await is_household_member(db, household_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this household"
@@ -59,139 +90,157 @@ async def upload_receipt(
         currency="USD",
         status="pending"
     )
+
+    # Flush for the receipt id, then stream the upload into UPLOAD_DIR
+    # (created at startup) under its receipt_<id> name; the row is committed
+    # once with its image reference
     db.add(db_receipt)
-    db.commit()
-    db.refresh(db_receipt)
+    await db.flush()
 
-    # Save uploaded file to storage
-    upload_dir = settings.UPLOAD_DIR
-    os.makedirs(upload_dir, exist_ok=True)
     _, ext = os.path.splitext(file.filename or "")
     ext = ext.lower() if ext else ".jpg"
-    file_path = os.path.join(upload_dir, f"receipt_{db_receipt.id}{ext}")
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    file_path = os.path.join(settings.UPLOAD_DIR, f"receipt_{db_receipt.id}{ext}")
+
+    try:
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await f.write(chunk)
+    except Exception:
+        # The uncommitted receipt row is rolled back with the session
+        if await aiofiles.os.path.exists(file_path):
+            await aiofiles.os.remove(file_path)
+        raise
 
-    # Update receipt with image reference
     db_receipt.image_ref = file_path
-    db.commit()
-    db.refresh(db_receipt)
-
-    # Schedule OCR processing in background
-    ocr_worker = OCRWorker()
-    if background_tasks is not None:
-        background_tasks.add_task(ocr_worker.process_receipt, db_receipt.id, file_path)
+    await db.commit()
+    # Lines only arrive once OCR runs; no need to SELECT for them
+    set_committed_value(db_receipt, "receipt_lines", [])
+
+    # Hand off OCR processing to the Celery ocr_queue
+    try:
+        await enqueue_receipt_processing(db_receipt.id, file_path)
+    except OperationalError:
+        # Broker unreachable: mark it failed so it can be retried rather
+        # than left pending with nothing to pick it up
+        db_receipt.status = "failed"
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Receipt {db_receipt.id} was saved but could not be queued for processing"
+        )
 
     return db_receipt
 
 
 @router.get("/", response_model=List[dict])
-def list_receipts(
-    db: Session = Depends(get_db),
+async def list_receipts(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """List recent receipts for households the user belongs to.
 
     Returns a simplified shape expected by the web UI.
     """
-    # Get household ids for current user
-    household_ids = [m.household_id for m in db.query(HouseholdUser).filter(HouseholdUser.user_id == current_user.id).all()]
-    if not household_ids:
-        return []
-
-    # Fetch recent receipts
-    receipts = db.query(Receipt).filter(Receipt.household_id.in_(household_ids)).order_by(Receipt.purchased_at.desc()).limit(50).all()
-
-    result = []
-    for r in receipts:
-        # Compute total from lines if available
-        total_amount = sum((line.line_price or 0.0) for line in (r.receipt_lines or []))
-        result.append({
+    household_ids = select(HouseholdUser.household_id).where(
+        HouseholdUser.user_id == current_user.id
+    )
+
+    # Fetch recent receipts; totals are stored on the receipt by the OCR worker
+    result = await db.execute(
+        select(
+            Receipt.id,
+            Receipt.image_ref,
+            Receipt.purchased_at,
+            Receipt.store_name,
+            Receipt.status,
+            Receipt.payer_id,
+            Receipt.total_amount
+        )
+        .where(Receipt.household_id.in_(household_ids))
+        .order_by(Receipt.purchased_at.desc())
+        .limit(50)
+    )
+
+    return [
+        {
             "id": r.id,
             "filename": os.path.basename(r.image_ref) if r.image_ref else f"receipt_{r.id}",
             "upload_date": r.purchased_at.isoformat() if r.purchased_at else None,
-            "total_amount": total_amount,
+            "total_amount": r.total_amount,
             "store_name": r.store_name,
             "ocr_status": r.status,
             "user_id": r.payer_id,
-        })
-
-    return result
+        }
+        for r in result
+    ]
 
 
 @router.get("/{receipt_id}", response_model=ReceiptSchema)
-def get_receipt(
+async def get_receipt(
     receipt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get receipt details."""
-    receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
-    if not receipt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    receipt = await authorize_receipt(
+        db, receipt_id, current_user.id,
+        options=[selectinload(Receipt.receipt_lines)]
+    )
 
     return receipt
 
 
 @router.get("/weeks/{week_id}/matches/pending", response_model=PendingMatches)
-def get_pending_matches(
+async def get_pending_matches(
     week_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get pending matches for a planning week."""
     # Find unmatched receipt lines within the planning week timeframe
-    from app.models.planning import PlanningWeek
-    week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-    if not week:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Planning week not found")
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id,
-        HouseholdUser.user_id == current_user.id,
-    ).first()
-    if not membership:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this household")
+    week = await authorize_planning_week(db, week_id, current_user.id)
 
     start_dt = datetime.combine(week.week_start, datetime.min.time())
     end_dt = start_dt + timedelta(days=7)
 
     # Get unmatched receipt lines for receipts in this time window
-    receipt_lines = (
-        db.query(ReceiptLine)
+    result = await db.execute(
+        select(ReceiptLine)
         .join(Receipt)
-        .filter(
+        .where(
             Receipt.household_id == week.household_id,
             Receipt.purchased_at >= start_dt,
             Receipt.purchased_at < end_dt,
             ~ReceiptLine.line_matches.any(),
         )
-        .all()
     )
+    receipt_lines = result.scalars().all()
 
-    # Generate suggestions using MatchingService
+    # Generate suggestions using MatchingService. They depend only on the
+    # line's name, quantity, unit and price, so duplicate lines share one call;
+    # distinct lines run in parallel, each in a worker thread with its own session
     matcher = MatchingService()
+
+    def line_key(rl):
+        return (rl.normalized_name or rl.raw_text, rl.qty, rl.unit, rl.line_price)
+
+    representatives = {}
+    for rl in receipt_lines:
+        representatives.setdefault(line_key(rl), rl)
+
+    async def suggest(rl):
+        async with _matcher_slots:
+            return await run_in_threadpool(
+                _call_with_session, matcher.find_matches_for_receipt_line, rl, week_id
+            )
+
+    results = await asyncio.gather(*[suggest(rl) for rl in representatives.values()])
+    suggestions_by_key = dict(zip(representatives, results))
+
     suggested_matches = []
     for rl in receipt_lines:
-        suggestions = matcher.find_matches_for_receipt_line(db, rl, week_id)
         # Convert suggestions to LineMatch-shaped dicts (id=0 for suggestions)
-        for s in suggestions[:3]:
+        for s in suggestions_by_key[line_key(rl)][:3]:
             suggested_matches.append({
                 "id": 0,
                 "receipt_line_id": rl.id,
@@ -207,48 +256,19 @@ def get_pending_matches(
 
 
 @router.post("/matches/{receipt_line_id}/confirm")
-def confirm_match(
+async def confirm_match(
     receipt_line_id: int,
     match_data: MatchConfirmation,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Confirm a receipt line match."""
-    # Get receipt line
-    receipt_line = db.query(ReceiptLine).filter(
-        ReceiptLine.id == receipt_line_id
-    ).first()
-
-    if not receipt_line:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt line not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt_line.receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    receipt_line = await authorize_receipt_line(db, receipt_line_id, current_user.id)
 
-    # Create or update line match
-    existing_match = db.query(LineMatch).filter(
-        LineMatch.receipt_line_id == receipt_line_id,
-        LineMatch.recipe_ingredient_id == match_data.recipe_ingredient_id
-    ).first()
-
-    if existing_match:
-        existing_match.qty_consumed = match_data.qty_consumed
-        existing_match.price_allocated = match_data.price_allocated
-        existing_match.confidence = 1.0  # User confirmed
-    else:
-        line_match = LineMatch(
+    # Create or update line match in one statement
+    await db.execute(
+        dialect_insert(LineMatch)
+        .values(
             receipt_line_id=receipt_line_id,
             recipe_ingredient_id=match_data.recipe_ingredient_id,
             confidence=1.0,  # User confirmed
@@ -257,45 +277,38 @@ def confirm_match(
             unit=receipt_line.unit or "unit",
             price_allocated=match_data.price_allocated
         )
-        db.add(line_match)
+        .on_conflict_do_update(
+            index_elements=["receipt_line_id", "recipe_ingredient_id"],
+            set_={
+                "qty_consumed": match_data.qty_consumed,
+                "price_allocated": match_data.price_allocated,
+                "confidence": 1.0
+            }
+        )
+    )
 
-    db.commit()
+    await db.commit()
     return {"message": "Match confirmed successfully"}
 
 
 @router.get("/{receipt_id}/matches/pending", response_model=dict)
-def get_receipt_pending_matches(
+async def get_receipt_pending_matches(
     receipt_id: int,
     week_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get pending matches for a specific receipt using advanced matching."""
-    # Get the receipt
-    receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
-    if not receipt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    receipt = await authorize_receipt(db, receipt_id, current_user.id)
 
     # Get unmatched receipt lines
-    unmatched_lines = db.query(ReceiptLine).filter(
-        ReceiptLine.receipt_id == receipt_id,
-        ~ReceiptLine.line_matches.any()
-    ).all()
+    result = await db.execute(
+        select(ReceiptLine).where(
+            ReceiptLine.receipt_id == receipt_id,
+            ~ReceiptLine.line_matches.any()
+        )
+    )
+    unmatched_lines = result.scalars().all()
 
     # Enforce AI (Gemini) configured
     if not settings.GEMINI_API_KEY:
@@ -305,23 +318,29 @@ def get_receipt_pending_matches(
     advanced_matcher = AdvancedMatchingService()
     matches_data = []
 
-    # Auto-match high confidence first
-    for line in unmatched_lines:
-        try:
-            advanced_matcher.auto_match_high_confidence(db, line, planning_week_id=1)
-        except Exception:
-            continue
+    # Auto-match high confidence first, all lines in one batched call and one
+    # transaction; the ids it matched tell us which lines are still pending
+    def auto_match(session, lines):
+        line_matches = advanced_matcher.auto_match_high_confidence_lines(
+            session, lines, planning_week_id=1, commit=False
+        )
+        matched_ids = {m.receipt_line_id for m in line_matches}
+        session.commit()
+        return matched_ids
 
-    # Refresh unmatched lines post auto-match
-    unmatched_lines = db.query(ReceiptLine).filter(
-        ReceiptLine.receipt_id == receipt_id,
-        ~ReceiptLine.line_matches.any()
-    ).all()
+    try:
+        matched_ids = await _run_matcher(auto_match, unmatched_lines)
+    except Exception:
+        matched_ids = set()
 
-    for line in unmatched_lines:
-        # Find matches for the specified planning week
-        matches = advanced_matcher.find_matches_for_receipt_line(db, line, week_id=week_id)
+    unmatched_lines = [line for line in unmatched_lines if line.id not in matched_ids]
+
+    # Find matches for the specified planning week in one batched call
+    matches_by_line = await _run_matcher(
+        advanced_matcher.find_matches_for_receipt_lines, unmatched_lines, week_id=week_id
+    )
 
+    for line in unmatched_lines:
         line_data = {
             "receipt_line": {
                 "id": line.id,
@@ -331,7 +350,7 @@ def get_receipt_pending_matches(
                 "unit": line.unit,
                 "line_price": line.line_price
             },
-            "suggested_matches": matches[:5]  # Top 5 matches
+            "suggested_matches": matches_by_line.get(line.id, [])[:5]  # Top 5 matches
         }
         matches_data.append(line_data)
 
@@ -345,107 +364,78 @@ def get_receipt_pending_matches(
 
 
 @router.post("/lines/{receipt_line_id}/match", response_model=dict)
-def create_manual_match(
+async def create_manual_match(
     receipt_line_id: int,
     match_data: MatchConfirmation,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a manual match with learning feedback."""
-    # Get receipt line
-    receipt_line = db.query(ReceiptLine).filter(
-        ReceiptLine.id == receipt_line_id
-    ).first()
+    receipt_line = await authorize_receipt_line(db, receipt_line_id, current_user.id)
 
-    if not receipt_line:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt line not found"
+    # Create the match (or update it if this pairing already exists)
+    result = await db.execute(
+        dialect_insert(LineMatch)
+        .values(
+            receipt_line_id=receipt_line_id,
+            recipe_ingredient_id=match_data.recipe_ingredient_id,
+            confidence=1.0,  # User confirmed
+            qty_purchased=receipt_line.qty or 1.0,
+            qty_consumed=match_data.qty_consumed,
+            unit=receipt_line.unit or "unit",
+            price_allocated=match_data.price_allocated
         )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt_line.receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
+        .on_conflict_do_update(
+            index_elements=["receipt_line_id", "recipe_ingredient_id"],
+            set_={
+                "qty_consumed": match_data.qty_consumed,
+                "price_allocated": match_data.price_allocated,
+                "confidence": 1.0
+            }
         )
-
-    # Create the match
-    line_match = LineMatch(
-        receipt_line_id=receipt_line_id,
-        recipe_ingredient_id=match_data.recipe_ingredient_id,
-        confidence=1.0,  # User confirmed
-        qty_purchased=receipt_line.qty or 1.0,
-        qty_consumed=match_data.qty_consumed,
-        unit=receipt_line.unit or "unit",
-        price_allocated=match_data.price_allocated
+        .returning(LineMatch.id)
     )
+    match_id = result.scalar_one()
 
-    db.add(line_match)
-    db.commit()
-    db.refresh(line_match)
-
-    # Store learning feedback
+    # Store learning feedback in the same transaction
     advanced_matcher = AdvancedMatchingService()
-    advanced_matcher.confirm_match(
-        db=db,
+    await db.run_sync(
+        advanced_matcher.confirm_match,
         user_id=current_user.id,
         receipt_line_id=receipt_line_id,
         ingredient_id=match_data.recipe_ingredient_id,
-        was_correct=True
+        was_correct=True,
+        receipt_line=receipt_line,
+        commit=False
     )
+    await db.commit()
 
     return {
         "message": "Match created successfully",
-        "match_id": line_match.id,
+        "match_id": match_id,
         "learning_stored": True
     }
 
 
 @router.post("/lines/{receipt_line_id}/reject", response_model=dict)
-def reject_suggested_match(
+async def reject_suggested_match(
     receipt_line_id: int,
     ingredient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Reject a suggested match for learning purposes."""
-    # Get receipt line
-    receipt_line = db.query(ReceiptLine).filter(
-        ReceiptLine.id == receipt_line_id
-    ).first()
-
-    if not receipt_line:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt line not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt_line.receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    receipt_line = await authorize_receipt_line(db, receipt_line_id, current_user.id)
 
     # Store negative feedback for learning
     advanced_matcher = AdvancedMatchingService()
-    advanced_matcher.confirm_match(
-        db=db,
+    await db.run_sync(
+        advanced_matcher.confirm_match,
         user_id=current_user.id,
         receipt_line_id=receipt_line_id,
         ingredient_id=ingredient_id,
-        was_correct=False
+        was_correct=False,
+        receipt_line=receipt_line
     )
 
     return {
@@ -455,51 +445,36 @@ def reject_suggested_match(
 
 
 @router.get("/{receipt_id}/matching-stats", response_model=dict)
-def get_matching_statistics(
+async def get_matching_statistics(
     receipt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get matching statistics for a receipt."""
-    # Get the receipt
-    receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
-    if not receipt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == receipt.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
+    await authorize_receipt(db, receipt_id, current_user.id)
+
+    # Line counts and confidence distribution in one aggregate query
+    result = await db.execute(
+        select(
+            func.count(distinct(ReceiptLine.id)),
+            func.count(distinct(LineMatch.receipt_line_id)),
+            func.sum(case((LineMatch.confidence >= 0.9, 1), else_=0)),
+            func.sum(case((and_(LineMatch.confidence >= 0.7, LineMatch.confidence < 0.9), 1), else_=0)),
+            func.sum(case((LineMatch.confidence < 0.7, 1), else_=0))
         )
-
-    # Calculate statistics
-    total_lines = db.query(ReceiptLine).filter(ReceiptLine.receipt_id == receipt_id).count()
-    matched_lines = db.query(ReceiptLine).filter(
-        ReceiptLine.receipt_id == receipt_id,
-        ReceiptLine.line_matches.any()
-    ).count()
+        .select_from(ReceiptLine)
+        .outerjoin(LineMatch, LineMatch.receipt_line_id == ReceiptLine.id)
+        .where(ReceiptLine.receipt_id == receipt_id)
+    )
+    total_lines, matched_lines, high, medium, low = result.one()
 
     unmatched_lines = total_lines - matched_lines
     match_rate = (matched_lines / total_lines * 100) if total_lines > 0 else 0
 
-    # Get confidence distribution
-    matches = db.query(LineMatch).join(ReceiptLine).filter(
-        ReceiptLine.receipt_id == receipt_id
-    ).all()
-
     confidence_stats = {
-        "high_confidence": len([m for m in matches if m.confidence >= 0.9]),
-        "medium_confidence": len([m for m in matches if 0.7 <= m.confidence < 0.9]),
-        "low_confidence": len([m for m in matches if m.confidence < 0.7]),
+        "high_confidence": high or 0,
+        "medium_confidence": medium or 0,
+        "low_confidence": low or 0,
     }
 
     return {
@@ -1,52 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.models.user import User
 from app.models.household import HouseholdUser
-from app.models.planning import PlanningWeek
 from app.models.settlement import Settlement
 from app.schemas.settlement import WeekSettlement
-from app.api.deps import get_current_user
-from app.models.receipt import Receipt
+from app.api.deps import get_current_user, authorize_planning_week
+from app.models.receipt import Receipt, ReceiptLine
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
 
 @router.get("/weeks/{week_id}/settlement", response_model=WeekSettlement)
-def get_week_settlement(
+async def get_week_settlement(
     week_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get settlement summary for a planning week."""
-    # Get planning week
-    week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-    if not week:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Planning week not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
-
-    # Get settlements for this week
-    settlements = db.query(Settlement).filter(
-        Settlement.planning_week_id == week_id
-    ).all()
-
-    total_amount = sum(settlement.amount for settlement in settlements)
+    await authorize_planning_week(db, week_id, current_user.id)
+
+    # Get settlements for this week with their total as a window sum
+    result = await db.execute(
+        select(
+            Settlement.planning_week_id,
+            Settlement.payer_id,
+            Settlement.payee_id,
+            Settlement.amount,
+            func.sum(Settlement.amount).over().label("total_amount")
+        ).where(Settlement.planning_week_id == week_id)
+    )
+    rows = result.mappings().all()
+
+    settlements = [
+        {k: row[k] for k in ("planning_week_id", "payer_id", "payee_id", "amount")}
+        for row in rows
+    ]
+    total_amount = rows[0]["total_amount"] if rows else 0.0
 
     # Check if settlements are balanced (sum should be close to 0)
     is_balanced = abs(total_amount) < 0.01
@@ -60,40 +53,23 @@ def get_week_settlement(
 
 
 @router.post("/weeks/{week_id}/close")
-def close_week_settlement(
+async def close_week_settlement(
     week_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Close settlements for a planning week and optionally sync to Splitwise."""
-    # Get planning week
-    week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-    if not week:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Planning week not found"
-        )
-
-    # Verify user is member of household
-    membership = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id,
-        HouseholdUser.user_id == current_user.id
-    ).first()
-
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this household"
-        )
+    week = await authorize_planning_week(db, week_id, current_user.id)
 
     # Calculate time window for the week [week_start, week_start + 7 days)
     start_dt = datetime.combine(week.week_start, datetime.min.time())
     end_dt = start_dt + timedelta(days=7)
 
     # Get household members and their weights (share_default)
-    members = db.query(HouseholdUser).filter(
-        HouseholdUser.household_id == week.household_id
-    ).all()
+    result = await db.execute(
+        select(HouseholdUser).where(HouseholdUser.household_id == week.household_id)
+    )
+    members = result.scalars().all()
     if not members:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No household members found")
 
@@ -101,30 +77,36 @@ def close_week_settlement(
     weights = {m.user_id: (m.share_default or 1.0) for m in members}
     total_weight = sum(weights.values()) or 1.0
 
-    # Sum total paid per payer for receipts in the week (completed or any status)
-    receipts = db.query(Receipt).filter(
-        Receipt.household_id == week.household_id,
-        Receipt.purchased_at >= start_dt,
-        Receipt.purchased_at < end_dt,
-    ).all()
+    # Sum total paid per payer for receipts in the week (completed or any status).
+    # Receipts whose lines don't add up to a positive total can't be settled; skip them
+    receipt_totals = (
+        select(
+            Receipt.payer_id,
+            func.sum(func.coalesce(ReceiptLine.line_price, 0.0)).label("total")
+        )
+        .join(ReceiptLine, ReceiptLine.receipt_id == Receipt.id)
+        .where(
+            Receipt.household_id == week.household_id,
+            Receipt.purchased_at >= start_dt,
+            Receipt.purchased_at < end_dt,
+        )
+        .group_by(Receipt.id, Receipt.payer_id)
+        .having(func.sum(func.coalesce(ReceiptLine.line_price, 0.0)) > 0)
+        .subquery()
+    )
+    result = await db.execute(
+        select(receipt_totals.c.payer_id, func.sum(receipt_totals.c.total))
+        .group_by(receipt_totals.c.payer_id)
+    )
 
     paid_by = {uid: 0.0 for uid in user_ids}
-    total_spend = 0.0
-    for r in receipts:
-        # Use sum of line prices if available, else omit (could extend to OCR lines)
-        receipt_total = 0.0
-        for line in r.receipt_lines:
-            receipt_total += line.line_price or 0.0
-        # If no lines present, we can't infer a total; skip
-        if receipt_total <= 0.0:
-            continue
-        paid_by[r.payer_id] = paid_by.get(r.payer_id, 0.0) + receipt_total
-        total_spend += receipt_total
+    paid_by.update(result.all())
+    total_spend = sum(paid_by.values())
 
     if total_spend <= 0:
         # Nothing to settle; clear existing settlements for this week
-        db.query(Settlement).filter(Settlement.planning_week_id == week_id).delete()
-        db.commit()
+        await db.execute(delete(Settlement).where(Settlement.planning_week_id == week_id))
+        await db.commit()
         return {"message": "No spending found for the week; settlements cleared"}
 
     # Compute fair share per user by weight
@@ -140,24 +122,23 @@ def close_week_settlement(
     debtors.sort(key=lambda x: x[1], reverse=True)
 
     # Clear existing settlements
-    db.query(Settlement).filter(Settlement.planning_week_id == week_id).delete()
+    await db.execute(delete(Settlement).where(Settlement.planning_week_id == week_id))
 
     # Greedy settlement matching
     i, j = 0, 0
-    created = 0
+    rows = []
     while i < len(debtors) and j < len(creditors):
         debtor_id, owe_amt = debtors[i]
         creditor_id, owed_amt = creditors[j]
         pay = min(owe_amt, owed_amt)
 
         if pay > 0.0:
-            db.add(Settlement(
-                planning_week_id=week_id,
-                payer_id=debtor_id,
-                payee_id=creditor_id,
-                amount=round(pay, 2),
-            ))
-            created += 1
+            rows.append({
+                "planning_week_id": week_id,
+                "payer_id": debtor_id,
+                "payee_id": creditor_id,
+                "amount": round(pay, 2),
+            })
 
         owe_amt -= pay
         owed_amt -= pay
@@ -168,6 +149,9 @@ def close_week_settlement(
         if owed_amt <= 0.005:
             j += 1
 
-    db.commit()
+    # Write all settlements in one executemany INSERT
+    if rows:
+        await db.execute(insert(Settlement), rows)
+    await db.commit()
 
-    return {"message": f"Week settlement closed successfully ({created} entries)"}
+    return {"message": f"Week settlement closed successfully ({len(rows)} entries)"}
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import secrets
 import urllib.parse
 
@@ -12,15 +13,23 @@ from app.schemas.settlement import (
     SplitwiseOAuthCallback,
     SplitwiseUser
 )
-from app.api.deps import get_current_user
-from app.core.redis_client import redis_client
+from app.api.deps import get_current_user, get_current_user_with_splitwise_link
+from app.core.redis_client import async_redis_bytes_client
 from app.services.splitwise_service import SplitwiseService
 
 router = APIRouter()
 
+# Only the state varies between authorize URLs, so the rest is encoded once
+AUTHORIZE_URL_PREFIX = "https://secure.splitwise.com/oauth/authorize?" + urllib.parse.urlencode({
+    "client_id": settings.SPLITWISE_CLIENT_ID or "",
+    "response_type": "code",
+    "redirect_uri": settings.SPLITWISE_REDIRECT_URI,
+    "scope": "user"
+}) + "&state="
+
 
 @router.get("/oauth/start", response_model=SplitwiseOAuthStart)
-def start_splitwise_oauth(
+async def start_splitwise_oauth(
     current_user: User = Depends(get_current_user)
 ):
     """Start Splitwise OAuth flow."""
@@ -30,37 +39,35 @@ def start_splitwise_oauth(
             detail="Splitwise integration not configured"
         )
 
-    # Generate state parameter for CSRF protection
-    state = secrets.token_urlsafe(32)
-
-    # Build authorization URL
-    auth_params = {
-        "client_id": settings.SPLITWISE_CLIENT_ID,
-        "response_type": "code",
-        "redirect_uri": settings.SPLITWISE_REDIRECT_URI,
-        "state": state,
-        "scope": "user"
-    }
-
-    authorization_url = (
-        "https://secure.splitwise.com/oauth/authorize?" +
-        urllib.parse.urlencode(auth_params)
-    )
-
-    # Store state in Redis with user_id for verification (10 min expiry)
-    redis_client.set(f"splitwise_state:{state}", str(current_user.id), ex=600)
+    # Generate a single-use state parameter for CSRF protection and store it
+    # with the user_id for verification (10 min expiry). SET NX never
+    # overwrites a live state; a collision just draws a new token
+    for _ in range(3):
+        state = secrets.token_urlsafe(32)
+        if await async_redis_bytes_client.set(
+            f"splitwise_state:{state}", str(current_user.id), ex=600, nx=True
+        ):
+            break
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not start Splitwise authorization"
+        )
 
-    return {
-        "authorization_url": authorization_url,
+    # token_urlsafe output needs no further escaping. Both fields are built
+    # here, so skip re-validating them against the response model
+    return ORJSONResponse({
+        "authorization_url": AUTHORIZE_URL_PREFIX + state,
         "state": state
-    }
+    })
 
 
 @router.get("/oauth/callback")
 async def handle_splitwise_callback(
     callback_data: SplitwiseOAuthCallback,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_with_splitwise_link)
 ):
     """Handle Splitwise OAuth callback."""
     if not settings.SPLITWISE_CLIENT_ID:
@@ -69,13 +76,13 @@ async def handle_splitwise_callback(
             detail="Splitwise integration not configured"
         )
 
-    # Verify state parameter
-    stored_user_id = redis_client.get(f"splitwise_state:{callback_data.state}")
+    # Verify state parameter, consuming it so it can't be replayed
+    stored_user_id = await async_redis_bytes_client.getdel(f"splitwise_state:{callback_data.state}")
     if not stored_user_id or int(stored_user_id) != current_user.id:
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
     # Exchange authorization code for access token (with graceful fallback)
-    svc = SplitwiseService()
+    svc = SplitwiseService(request.app.state.http_client)
     tokens = None
     try:
         tokens = await svc.exchange_code_for_tokens(callback_data.code)
@@ -96,7 +103,7 @@ async def handle_splitwise_callback(
         pass
 
     # Upsert SplitwiseLink
-    link = db.query(SplitwiseLink).filter(SplitwiseLink.user_id == current_user.id).first()
+    link = current_user.splitwise_link
     if not link:
         link = SplitwiseLink(
             user_id=current_user.id,
@@ -108,23 +115,18 @@ async def handle_splitwise_callback(
         link.oauth_tokens = tokens
         if splitwise_user_id:
             link.splitwise_user_id = splitwise_user_id
-    db.commit()
-
-    # Clear used state
-    redis_client.delete(f"splitwise_state:{callback_data.state}")
+    await db.commit()
 
     return {"message": "Splitwise account linked"}
 
 
 @router.get("/me", response_model=SplitwiseUser)
 async def get_splitwise_user(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    current_user: User = Depends(get_current_user_with_splitwise_link)
 ):
     """Get current user's Splitwise information."""
-    splitwise_link = db.query(SplitwiseLink).filter(
-        SplitwiseLink.user_id == current_user.id
-    ).first()
+    splitwise_link = current_user.splitwise_link
 
     if not splitwise_link:
         raise HTTPException(
@@ -133,7 +135,7 @@ async def get_splitwise_user(
         )
 
     # Try API call to Splitwise; if not available, return fallback using local data
-    svc = SplitwiseService()
+    svc = SplitwiseService(request.app.state.http_client)
     tokens = splitwise_link.oauth_tokens or {}
     access_token = tokens.get("access_token")
 
@@ -154,9 +156,9 @@ async def get_splitwise_user(
     if not last_name:
         last_name = parts[1] if len(parts) > 1 else ""
 
-    return {
+    return ORJSONResponse({
         "id": splitwise_link.splitwise_user_id,
         "first_name": first_name,
         "last_name": last_name,
         "email": current_user.email,
-    }
+    })
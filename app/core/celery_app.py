@@ -0,0 +1,17 @@
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "mealsplit",
+    broker=settings.CELERY_BROKER_URL,
+    include=["app.workers.tasks"],
+)
+
+celery_app.conf.update(
+    task_routes={"ocr_process_receipt": {"queue": "ocr_queue"}},
+    # OCR jobs are long-running; don't let one worker hoard queued receipts
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+)
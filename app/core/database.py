@@ -1,10 +1,25 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator
 
 from app.core.config import settings
 
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)."""
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url[len("postgres://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# Sync engine for workers, scripts and Alembic
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -13,13 +28,40 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers
+ASYNC_DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    # aiosqlite has no connection pool to size
+    **({} if ASYNC_DATABASE_URL.startswith("sqlite") else {"pool_size": 20}),
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
-def get_db() -> Generator:
-    """Database dependency for FastAPI."""
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+def dialect_insert(model):
+    """INSERT construct with ON CONFLICT support for the async engine's dialect."""
+    if async_engine.dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Database dependency for FastAPI.
+
+    The session is bound to a single pooled connection for the whole request,
+    so commits mid-handler don't hand it back to the pool and check it out again.
+    """
+    async with async_engine.connect() as conn:
+        async with AsyncSessionLocal(bind=conn) as db:
+            yield db
@@ -1,5 +1,6 @@
 import redis
-from typing import Optional
+import redis.asyncio
+from typing import Optional, Union
 import json
 import logging
 
@@ -7,21 +8,28 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Replies are str on decoding clients and bytes otherwise
+RedisValue = Union[str, bytes]
+
 class RedisClient:
     def __init__(self):
+        self.pool = None
         self.redis_client = None
         self.connect()
 
     def connect(self):
         """Connect to Redis."""
         try:
-            self.redis_client = redis.from_url(
+            self.pool = redis.ConnectionPool.from_url(
                 settings.REDIS_URL,
+                max_connections=settings.REDIS_POOL_SIZE,
+                health_check_interval=30,
                 decode_responses=True,
                 retry_on_timeout=True,
                 socket_keepalive=True,
                 socket_keepalive_options={},
             )
+            self.redis_client = redis.Redis(connection_pool=self.pool)
             # Test connection
             self.redis_client.ping()
             logger.info("Connected to Redis")
@@ -29,6 +37,11 @@ class RedisClient:
             logger.error(f"Failed to connect to Redis: {e}")
             self.redis_client = None
 
+    def close(self):
+        """Disconnect every connection in the pool."""
+        if self.pool:
+            self.pool.disconnect()
+
     def get(self, key: str) -> Optional[str]:
         """Get a value from Redis."""
         if not self.redis_client:
@@ -39,16 +52,26 @@ class RedisClient:
             logger.error(f"Redis GET error: {e}")
             return None
 
-    def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
-        """Set a value in Redis."""
+    def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False) -> bool:
+        """Set a value in Redis (only if the key is absent when nx=True)."""
         if not self.redis_client:
             return False
         try:
-            return self.redis_client.set(key, value, ex=ex)
+            return bool(self.redis_client.set(key, value, ex=ex, nx=nx))
         except Exception as e:
             logger.error(f"Redis SET error: {e}")
             return False
 
+    def getdel(self, key: str) -> Optional[str]:
+        """Atomically get a value and delete its key (Redis 6.2+)."""
+        if not self.redis_client:
+            return None
+        try:
+            return self.redis_client.getdel(key)
+        except Exception as e:
+            logger.error(f"Redis GETDEL error: {e}")
+            return None
+
     def delete(self, key: str) -> bool:
         """Delete a key from Redis."""
         if not self.redis_client:
@@ -70,6 +93,100 @@ class RedisClient:
             logger.error(f"Redis PUBLISH error: {e}")
             return False
 
+    def publish_batch(self, messages: list) -> bool:
+        """Publish (channel, message) pairs in one pipelined round trip."""
+        if not self.redis_client:
+            return False
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for channel, message in messages:
+                pipe.publish(channel, message)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Redis PUBLISH error: {e}")
+            return False
+
+    def set_many(self, items: dict, ex: Optional[int] = None) -> bool:
+        """Set several keys (each with the same expiry) in one pipelined round trip."""
+        if not self.redis_client:
+            return False
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(key, value, ex=ex)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Redis SET error: {e}")
+            return False
+
+    def xadd(self, stream: str, fields: dict, maxlen: int = 10000, approximate: bool = True) -> Optional[RedisValue]:
+        """Append an entry to a capped Redis stream and return its id."""
+        if not self.redis_client:
+            return None
+        try:
+            return self.redis_client.xadd(stream, fields, maxlen=maxlen, approximate=approximate)
+        except Exception as e:
+            logger.error(f"Redis XADD error: {e}")
+            return None
+
+    def xadd_many(self, stream: str, entries: list, maxlen: int = 10000, approximate: bool = True) -> bool:
+        """Append several entries to a stream in one pipelined round trip."""
+        if not self.redis_client:
+            return False
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for fields in entries:
+                pipe.xadd(stream, fields, maxlen=maxlen, approximate=approximate)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Redis XADD error: {e}")
+            return False
+
+    def ensure_group(self, stream: str, group: str) -> bool:
+        """Create a consumer group (and the stream) unless it already exists."""
+        if not self.redis_client:
+            return False
+        try:
+            self.redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Redis XGROUP CREATE error: {e}")
+                return False
+        except Exception as e:
+            logger.error(f"Redis XGROUP CREATE error: {e}")
+            return False
+        return True
+
+    def xreadgroup(
+        self,
+        group: str,
+        consumer: str,
+        streams: dict,
+        count: Optional[int] = None,
+        block: Optional[int] = None
+    ) -> list:
+        """Read new entries for a consumer group; acknowledge them with xack."""
+        if not self.redis_client:
+            return []
+        try:
+            return self.redis_client.xreadgroup(group, consumer, streams, count=count, block=block) or []
+        except Exception as e:
+            logger.error(f"Redis XREADGROUP error: {e}")
+            return []
+
+    def xack(self, stream: str, group: str, *ids) -> int:
+        """Acknowledge processed stream entries."""
+        if not self.redis_client:
+            return 0
+        try:
+            return self.redis_client.xack(stream, group, *ids)
+        except Exception as e:
+            logger.error(f"Redis XACK error: {e}")
+            return 0
+
     def subscribe(self, channels: list):
         """Subscribe to Redis channels."""
         if not self.redis_client:
@@ -83,4 +200,109 @@ class RedisClient:
             return None
 
 
-redis_client = RedisClient()
\ No newline at end of file
+class AsyncRedisClient:
+    """asyncio counterpart of RedisClient for use from async request handlers."""
+
+    def __init__(self, decode_responses: bool = True):
+        self.decode_responses = decode_responses
+        self.redis_client = None
+        self._connect_attempted = False
+
+    async def connect(self):
+        """Connect to Redis; call from the server's event loop (e.g. at startup)."""
+        self._connect_attempted = True
+        try:
+            # redis.asyncio needs its own pool type; it gets the same limits
+            pool = redis.asyncio.ConnectionPool.from_url(
+                settings.REDIS_URL,
+                max_connections=settings.REDIS_POOL_SIZE,
+                health_check_interval=30,
+                decode_responses=self.decode_responses,
+                retry_on_timeout=True,
+                socket_keepalive=True,
+                socket_keepalive_options={},
+            )
+            # from_pool hands the pool to the client, so aclose() releases it
+            self.redis_client = redis.asyncio.Redis.from_pool(pool)
+            # Test connection
+            await self.redis_client.ping()
+            logger.info("Connected to Redis (asyncio)")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis: {e}")
+            self.redis_client = None
+
+    async def close(self):
+        """Close the connection pool."""
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    async def _client(self):
+        """Return the client, connecting on first use if startup hasn't."""
+        if not self._connect_attempted:
+            await self.connect()
+        return self.redis_client
+
+    async def get(self, key: str) -> Optional[RedisValue]:
+        """Get a value from Redis."""
+        client = await self._client()
+        if not client:
+            return None
+        try:
+            return await client.get(key)
+        except Exception as e:
+            logger.error(f"Redis GET error: {e}")
+            return None
+
+    async def set(self, key: str, value: RedisValue, ex: Optional[int] = None, nx: bool = False) -> bool:
+        """Set a value in Redis (only if the key is absent when nx=True)."""
+        client = await self._client()
+        if not client:
+            return False
+        try:
+            return bool(await client.set(key, value, ex=ex, nx=nx))
+        except Exception as e:
+            logger.error(f"Redis SET error: {e}")
+            return False
+
+    async def getdel(self, key: str) -> Optional[RedisValue]:
+        """Atomically get a value and delete its key (Redis 6.2+)."""
+        client = await self._client()
+        if not client:
+            return None
+        try:
+            return await client.getdel(key)
+        except Exception as e:
+            logger.error(f"Redis GETDEL error: {e}")
+            return None
+
+    async def delete(self, key: str) -> bool:
+        """Delete a key from Redis."""
+        client = await self._client()
+        if not client:
+            return False
+        try:
+            return bool(await client.delete(key))
+        except Exception as e:
+            logger.error(f"Redis DELETE error: {e}")
+            return False
+
+    async def publish(self, channel: str, message: str) -> bool:
+        """Publish a message to a Redis channel."""
+        client = await self._client()
+        if not client:
+            return False
+        try:
+            await client.publish(channel, message)
+            return True
+        except Exception as e:
+            logger.error(f"Redis PUBLISH error: {e}")
+            return False
+
+
+# Sync client for workers and other sync code; async clients for request
+# handlers. The bytes client skips UTF-8 decoding for values parsed directly
+# (e.g. int() of a user id)
+redis_client = RedisClient()
+async_redis_client = AsyncRedisClient()
+async_redis_bytes_client = AsyncRedisClient(decode_responses=False)
\ No newline at end of file
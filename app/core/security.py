@@ -1,12 +1,99 @@
-from datetime import datetime, timedelta
-from typing import Any, Union, Optional
-from jose import jwt, JWTError
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple, Union, Optional
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+import orjson
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 from app.core.config import settings
+from app.core.ttl_cache import TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2id, by default at the OWASP / RFC 9106 second-profile cost (46 MiB,
+# t=1, p=1); bcrypt stays verifiable so legacy hashes are upgraded on next login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__parallelism=1,
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Dedicated pool for password hashing; argon2-cffi and bcrypt release the GIL
+# while hashing, so this keeps auth bursts off the event loop and other work.
+HASH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="password-hash",
+)
+
+# Verified tokens: blake2b(token) -> (subject, token type), kept until the
+# TTL or the token's expiry. Keyed by digest so raw tokens are never held in memory.
+TOKEN_CACHE_MAXSIZE = 10_000
+TOKEN_CACHE_TTL = 60
+_token_cache: TTLCache[bytes, Tuple[str, str]] = TTLCache(TOKEN_CACHE_MAXSIZE, TOKEN_CACHE_TTL)
+
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url, as used by JWS."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Every token we mint shares this header, so it is encoded once
+JWT_HEADER_B64 = _b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+
+
+# Token lifetimes in seconds; JWT exp is a Unix timestamp
+ACCESS_TOKEN_EXPIRE_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+REFRESH_TOKEN_EXPIRE_SECONDS = settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+
+# HMAC-SHA256 state keyed with SECRET_KEY once; each signature copies it
+# instead of re-deriving the padded key
+_JWT_HMAC = hmac.new(settings.SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Decode unpadded base64url."""
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    """HS256 signature of a JWS signing input."""
+    mac = _JWT_HMAC.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+
+def _encode_jwt(claims: Dict[str, Any]) -> str:
+    """Sign claims as an HS256 JWT using the precomputed header."""
+    signing_input = JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(claims))
+    return (signing_input + b"." + _b64url(_sign(signing_input))).decode()
+
+
+def _decode_jwt(token: str) -> Optional[Dict[str, Any]]:
+    """Return the claims of a validly signed, unexpired HS256 JWT, else None."""
+    try:
+        signing_input, _, signature = token.encode().rpartition(b".")
+        _, _, payload_b64 = signing_input.partition(b".")
+        if not payload_b64 or not hmac.compare_digest(_b64url_decode(signature), _sign(signing_input)):
+            return None
+        claims = orjson.loads(_b64url_decode(payload_b64))
+    except ValueError:
+        return None
+
+    if not isinstance(claims, dict):
+        return None
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        return None
+    return claims
 
 
 def create_access_token(
@@ -14,43 +101,78 @@ def create_access_token(
 ) -> str:
     """Create a JWT access token."""
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        lifetime = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    to_encode = {"exp": expire, "sub": str(subject), "type": "access"}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
+        lifetime = ACCESS_TOKEN_EXPIRE_SECONDS
+    to_encode = {"exp": int(time.time()) + lifetime, "sub": str(subject), "type": "access"}
+    return _encode_jwt(to_encode)
 
 
 def create_refresh_token(subject: Union[str, Any]) -> str:
     """Create a JWT refresh token."""
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = int(time.time()) + REFRESH_TOKEN_EXPIRE_SECONDS
     to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
+    return _encode_jwt(to_encode)
 
 
 def verify_token(token: str, token_type: str = "access") -> Optional[str]:
-    """Verify a JWT token and return the subject."""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        subject: str = payload.get("sub")
-        token_type_claim: str = payload.get("type")
+    """Verify a JWT token and return the subject.
 
-        if subject is None or token_type_claim != token_type:
-            return None
-        return subject
-    except JWTError:
+    Recently verified tokens are served from an in-process cache so repeat
+    requests skip signature verification; only expiry is re-checked.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        subject, token_type_claim = cached
+        return subject if token_type_claim == token_type else None
+
+    payload = _decode_jwt(token)
+    if payload is None:
+        return None
+
+    subject: str = payload.get("sub")
+    token_type_claim: str = payload.get("type")
+
+    if subject is None or token_type_claim is None:
         return None
+    # Cached until the TTL or the token's expiry, whichever is first
+    _token_cache.set(key, (subject, token_type_claim), ttl=payload["exp"] - time.time())
+
+    if token_type_claim != token_type:
+        return None
+    return subject
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
+    """Verify a password against its hash (constant-time digest compare)."""
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash uses a deprecated scheme or parameters."""
+    return pwd_context.needs_update(hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        HASH_EXECUTOR, verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_EXECUTOR, get_password_hash, password)
+
+
+# Verified against when a login email is unknown so response time doesn't
+# reveal whether the account exists.
+DUMMY_HASH = get_password_hash("x" * 16)
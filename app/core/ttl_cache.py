@@ -0,0 +1,64 @@
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded in-process cache whose entries expire; safe to share between threads.
+
+    Entries are kept in insertion order, so eviction only looks at the oldest
+    ones instead of scanning the whole cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[K, Tuple[V, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the live value for key, or None."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            with self._lock:
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return None
+        return entry[0]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (the cache default if not given)."""
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            # Re-inserting moves the key to the end, keeping the order by age
+            self._data.pop(key, None)
+            self._evict(now)
+            self._data[key] = (value, expires)
+
+    def pop(self, key: K) -> None:
+        """Drop key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries from the old end, then the oldest if still full."""
+        data = self._data
+        while data:
+            oldest = next(iter(data))
+            if data[oldest][1] > now and len(data) < self.maxsize:
+                break
+            del data[oldest]
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+import asyncio
 import logging
+import os
 
 from app.core.config import settings
 from app.api.v1 import auth, households, planning, receipts, settlements, splitwise
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client, async_redis_client, async_redis_bytes_client
+from app.services.splitwise_service import get_http_client, close_http_client
+from app.services.advanced_matching_service import AdvancedMatchingService
+from app.core.security import DUMMY_HASH, create_access_token, verify_password_async, verify_token
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,12 +21,15 @@ app = FastAPI(
     title="MealSplit API",
     description="OCR-based grocery receipt splitting app",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
+    # A set makes the per-request origin check a hash lookup
+    allow_origins=frozenset(settings.BACKEND_CORS_ORIGINS),
+    allow_origin_regex=settings.BACKEND_CORS_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -37,6 +48,52 @@ app.include_router(receipts.router, prefix=f"{settings.API_V1_STR}/receipts", ta
 app.include_router(settlements.router, prefix=f"{settings.API_V1_STR}/settlements", tags=["settlements"])
 app.include_router(splitwise.router, prefix=f"{settings.API_V1_STR}/splitwise", tags=["splitwise"])
 
+@app.on_event("startup")
+async def create_upload_dir():
+    """Create the upload directory once rather than on every upload."""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+@app.on_event("startup")
+async def connect_redis():
+    """Open the asyncio Redis pools on the server's event loop."""
+    await async_redis_client.connect()
+    await async_redis_bytes_client.connect()
+
+@app.on_event("startup")
+async def create_http_client():
+    """Share one pooled HTTP client for outbound API calls across requests."""
+    app.state.http_client = get_http_client()
+
+@app.on_event("startup")
+async def warm_up_auth():
+    """Exercise password verification and JWT signing before the first login."""
+    # DUMMY_HASH was computed at import; this also starts a hashing thread
+    await verify_password_async("x" * 16, DUMMY_HASH)
+    verify_token(create_access_token("0"))
+
+def _warm_embedding_cache():
+    db = SessionLocal()
+    try:
+        AdvancedMatchingService().warm_embedding_cache(db)
+    except Exception as e:
+        logger.warning(f"Embedding cache warmup failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def warm_up_embeddings():
+    """Embed the ingredient catalogue in the background without delaying startup."""
+    if settings.GEMINI_API_KEY:
+        asyncio.get_running_loop().run_in_executor(None, _warm_embedding_cache)
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Release pooled connections to external APIs."""
+    await close_http_client()
+    await async_redis_client.close()
+    await async_redis_bytes_client.close()
+    redis_client.close()
+
 @app.get("/")
 async def root():
     return {"message": "MealSplit API", "version": "1.0.0"}
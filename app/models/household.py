@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -20,6 +20,11 @@ class Household(Base):
 
 class HouseholdUser(Base):
     __tablename__ = "household_users"
+    __table_args__ = (
+        # The (household_id, user_id) PK covers membership checks;
+        # this serves the "households for a user" lookups
+        Index("ix_household_user_user_hh", "user_id", "household_id"),
+    )
 
     household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -19,6 +19,10 @@ class UnitConversion(Base):
 class UserMatchConfirmation(Base):
     """Store user confirmations for learning algorithm improvements."""
     __tablename__ = "user_match_confirmations"
+    __table_args__ = (
+        # Learning-boost lookups filter on both columns
+        Index("ix_user_match_confirmation_text_correct", "normalized_text", "was_correct"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -39,7 +43,7 @@ class IngredientSynonym(Base):
     __tablename__ = "ingredient_synonyms"
 
     id = Column(Integer, primary_key=True, index=True)
-    ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), nullable=False)
+    ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), nullable=False, index=True)
     synonym = Column(String, nullable=False, index=True)
     normalized_synonym = Column(String, nullable=False, index=True)
     source = Column(String, nullable=False)  # user, system, import
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Date, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -7,6 +7,9 @@ from app.core.database import Base
 
 class PlanningWeek(Base):
     __tablename__ = "planning_weeks"
+    __table_args__ = (
+        Index("ix_planning_week_hh_start", "household_id", "week_start", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
@@ -37,8 +40,8 @@ class WeekRecipe(Base):
     __tablename__ = "week_recipes"
 
     id = Column(Integer, primary_key=True, index=True)
-    planning_week_id = Column(Integer, ForeignKey("planning_weeks.id"), nullable=False)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    planning_week_id = Column(Integer, ForeignKey("planning_weeks.id"), nullable=False, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False, index=True)
     planned_servings = Column(Integer, nullable=False)
 
     # Relationships
@@ -66,7 +69,7 @@ class ShoppingItem(Base):
     __tablename__ = "shopping_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    planning_week_id = Column(Integer, ForeignKey("planning_weeks.id"), nullable=False)
+    planning_week_id = Column(Integer, ForeignKey("planning_weeks.id"), nullable=False, index=True)
     canonical_name = Column(String, nullable=False)
     qty_needed = Column(Float, nullable=False)
     unit = Column(String, nullable=False)
@@ -80,7 +83,7 @@ class ShoppingItemLink(Base):
     __tablename__ = "shopping_item_links"
 
     shopping_item_id = Column(Integer, ForeignKey("shopping_items.id"), primary_key=True)
-    recipe_ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), primary_key=True)
+    recipe_ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), primary_key=True, index=True)
     ratio = Column(Float, nullable=False)
 
     # Relationships
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -9,14 +9,15 @@ class Receipt(Base):
     __tablename__ = "receipts"
 
     id = Column(Integer, primary_key=True, index=True)
-    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
-    payer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False, index=True)
+    payer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     store_name = Column(String, nullable=False)
     purchased_at = Column(DateTime(timezone=True), nullable=False)
     currency = Column(String, nullable=False, default="USD")
     image_ref = Column(String)  # Path or URL to receipt image
     ocr_json_ref = Column(String)  # Path or URL to OCR results JSON
     status = Column(String, nullable=False, default="pending")  # pending, processing, completed, failed
+    total_amount = Column(Float, nullable=False, default=0.0, server_default="0")  # Sum of line prices, kept by the OCR worker
 
     # Relationships
     household = relationship("Household", back_populates="receipts")
@@ -26,6 +27,9 @@ class Receipt(Base):
 
 class ReceiptLine(Base):
     __tablename__ = "receipt_lines"
+    __table_args__ = (
+        Index("ix_receipt_line_receipt", "receipt_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     receipt_id = Column(Integer, ForeignKey("receipts.id"), nullable=False)
@@ -45,10 +49,13 @@ class ReceiptLine(Base):
 
 class LineMatch(Base):
     __tablename__ = "line_matches"
+    __table_args__ = (
+        Index("ix_line_match_line_ingredient", "receipt_line_id", "recipe_ingredient_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     receipt_line_id = Column(Integer, ForeignKey("receipt_lines.id"), nullable=False)
-    recipe_ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), nullable=False)
+    recipe_ingredient_id = Column(Integer, ForeignKey("recipe_ingredients.id"), nullable=False, index=True)
     confidence = Column(Float, nullable=False)  # 0.0 to 1.0
     qty_purchased = Column(Float, nullable=False)
     qty_consumed = Column(Float, nullable=False)
@@ -1,20 +1,83 @@
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Optional, Set, Tuple
 import logging
+import threading
+import numpy as np
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from rapidfuzz import fuzz, process
 from dataclasses import dataclass
 
-from app.models.planning import RecipeIngredient, PlanningWeek, WeekRecipe
+from app.models.planning import RecipeIngredient, WeekRecipe
 from app.models.receipt import ReceiptLine, LineMatch
 from app.models.matching import UserMatchConfirmation, IngredientSynonym
 from app.services.text_normalizer import TextNormalizer
 from app.services.unit_converter import UnitConverter
-from app.services.gemini_service import GeminiService, cosine_similarity
+from app.services.gemini_service import GeminiService
 from app.core.config import settings
+from app.core.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 
+class IngredientEntry(NamedTuple):
+    """The recipe ingredient fields matching needs, detached from any session."""
+    id: int
+    name: str
+    unit: str
+
+
+class IngredientCatalog(NamedTuple):
+    """All recipe ingredients with their normalized names and synonyms, in the same order."""
+    version: Tuple[int, Optional[int]]
+    ingredients: List[IngredientEntry]
+    names: List[str]
+    synonyms: List[FrozenSet[str]]
+    # Indices of ingredients with synonyms besides their own name
+    with_variants: List[int]
+    words: List[FrozenSet[str]]
+    # word -> indices of the ingredients whose name contains it
+    word_index: Dict[str, List[int]]
+
+
+# Suggestions returned per receipt line
+MATCH_SUGGESTION_LIMIT = 5
+
+# Process-wide; reloaded when ingredients are added or removed
+_catalog: Optional[IngredientCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+# Planned ingredient ids per week. Recipes added through the API invalidate
+# their week; other writers wait out the TTL
+WEEK_INGREDIENT_CACHE_MAXSIZE = 1_000
+WEEK_INGREDIENT_CACHE_TTL = 60
+_week_ingredient_cache: TTLCache[int, FrozenSet[int]] = TTLCache(
+    WEEK_INGREDIENT_CACHE_MAXSIZE, WEEK_INGREDIENT_CACHE_TTL
+)
+
+
+def invalidate_week_ingredients(week_id: int) -> None:
+    """Drop the cached planned ingredients of a week after its recipes change."""
+    _week_ingredient_cache.pop(week_id)
+
+
+# Confirmed ingredient ids per normalized text. Confirmations stored by this
+# process invalidate their text; others wait out the TTL
+CONFIRMATION_CACHE_MAXSIZE = 10_000
+CONFIRMATION_CACHE_TTL = 300
+_confirmation_cache: TTLCache[str, FrozenSet[int]] = TTLCache(
+    CONFIRMATION_CACHE_MAXSIZE, CONFIRMATION_CACHE_TTL
+)
+
+
+def _unit_rows(vectors: List[List[float]]) -> np.ndarray:
+    """Stack vectors into a float32 matrix with L2-normalized rows (zero rows stay zero)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
 @dataclass
 class MatchResult:
     """Result of ingredient matching."""
@@ -44,79 +107,153 @@ class AdvancedMatchingService:
 
     def find_matches_for_receipt_line(self, db: Session, receipt_line: ReceiptLine, week_id: int) -> List[Dict[str, Any]]:
         """Find potential ingredient matches for a receipt line using multi-stage pipeline."""
+        return self.find_matches_for_receipt_lines(db, [receipt_line], week_id).get(receipt_line.id, [])
+
+    def find_matches_for_receipt_lines(self, db: Session, receipt_lines: List[ReceiptLine], week_id: int) -> Dict[int, List[Dict[str, Any]]]:
+        """Find matches for many receipt lines at once, keyed by line id.
+
+        Ingredients, embeddings, week context and confirmations are fetched
+        once for the whole batch rather than once per line.
+        """
 
         if not self.gemini.is_enabled():
             raise RuntimeError("Gemini AI is required for matching but is not configured")
 
-        logger.info(f"Finding matches for receipt line: {receipt_line.raw_text}")
+        if not receipt_lines:
+            return {}
+
+        logger.info(f"Finding matches for {len(receipt_lines)} receipt lines")
 
         # Get all available ingredients
-        ingredients = db.query(RecipeIngredient).all()
+        catalog = self._ingredient_catalog(db)
+        ingredients, ing_names = catalog.ingredients, catalog.names
         if not ingredients:
             logger.warning("No ingredients found in database")
-            return []
-
-        # Stage 1: Normalize the receipt text
-        normalized_text = self.normalizer.normalize(receipt_line.raw_text)
-        logger.debug(f"Normalized text: '{receipt_line.raw_text}' -> '{normalized_text}'")
+            return {line.id: [] for line in receipt_lines}
 
-        # Stage 2: Gemini normalization boost (mandatory)
-        gem_norm = self.gemini.normalize_text(normalized_text)
-        normalized_candidate = gem_norm or normalized_text
+        # Lines with the same text, quantity and price get the same suggestions,
+        # so only one line per signature goes through the pipeline
+        distinct_lines: Dict[Tuple[str, Optional[float], Optional[str], float], ReceiptLine] = {}
+        for line in receipt_lines:
+            distinct_lines.setdefault(self._line_signature(line), line)
 
-        # Stage 3: Multi-stage matching + embedding boost
-        matches = self._multi_stage_matching(normalized_candidate, ingredients, receipt_line)
+        # Stage 1: Normalize the receipt text
+        # Stage 2: Gemini normalization boost (mandatory), once per distinct text
+        normalized_texts: Dict[int, str] = {}
+        for line in distinct_lines.values():
+            normalized_texts[line.id] = self.normalizer.normalize(line.raw_text)
+            logger.debug(f"Normalized text: '{line.raw_text}' -> '{normalized_texts[line.id]}'")
+
+        # Gemini calls for the distinct texts overlap instead of running back to back
+        gemini_norms = self.gemini.normalize_texts(list(normalized_texts.values()))
+        candidate_texts: Dict[int, str] = {
+            line_id: gemini_norms[text] or text for line_id, text in normalized_texts.items()
+        }
+
+        query_texts = list(dict.fromkeys(candidate_texts.values()))
+        query_rows = {text: i for i, text in enumerate(query_texts)}
+        ing_cols = {ing.id: j for j, ing in enumerate(ingredients)}
+
+        # Fuzzy-score every distinct text against every ingredient in RapidFuzz's
+        # C++ core; the cutoff lets it abandon pairs that can't reach the
+        # threshold (they score 0)
+        fuzzy_scores = process.cdist(
+            query_texts, ing_names, scorer=fuzz.ratio, dtype=np.float64, workers=-1,
+            score_cutoff=self.min_threshold * 100
+        ) / 100.0
+
+        # Embed every distinct receipt text and all ingredient names in one call
+        query_matrix: Optional[np.ndarray] = None
+        ing_matrix: Optional[np.ndarray] = None
         try:
-            # Compute an embedding for receipt text and for all ingredient names
-            ing_names = [self.normalizer.normalize(ing.name) for ing in ingredients]
-            embeds = self.gemini.embed_texts([normalized_candidate] + ing_names)
-            if embeds and len(embeds) == 1 + len(ingredients):
-                qvec = embeds[0]
-                ing_vecs = embeds[1:]
-                # Blend cosine similarity into confidence
-                alpha = 0.7  # weight for embeddings
-                by_id = {ing.id: vec for ing, vec in zip(ingredients, ing_vecs)}
-                for m in matches:
-                    vec = by_id.get(m.recipe_ingredient_id)
-                    if vec:
-                        emb_sim = cosine_similarity(qvec, vec)
-                        m.confidence = min(1.0, alpha * emb_sim + (1 - alpha) * m.confidence)
+            embeds = self.gemini.embed_texts(query_texts + ing_names)
+            if embeds and len(embeds) == len(query_texts) + len(ingredients):
+                query_matrix = _unit_rows(embeds[:len(query_texts)])
+                ing_matrix = _unit_rows(embeds[len(query_texts):])
         except Exception:
             pass
 
-        # Stage 3: Context-aware filtering (boost ingredients in current week)
-        matches = self._apply_context_boost(matches, week_id, db)
-
-        # Stage 4: Learn from previous confirmations
-        matches = self._apply_learning_boost(matches, normalized_text, db)
-
-        # Convert to API format
-        results = []
-        for match in matches[:5]:  # Top 5 matches
-            results.append({
-                "recipe_ingredient_id": match.recipe_ingredient_id,
-                "confidence": match.confidence,
-                "suggested_qty_consumed": match.suggested_qty_consumed,
-                "suggested_price": match.suggested_price,
-                "match_reason": match.match_reason,
-                "ingredient_name": match.ingredient_name,
-                "unit_compatible": match.unit_compatible
-            })
-
-        logger.info(f"Found {len(results)} matches for '{receipt_line.raw_text}'")
-        return results
-
-    def auto_match_high_confidence(self, db: Session, receipt_line: ReceiptLine, planning_week_id: int) -> Optional[LineMatch]:
+        week_ingredient_ids = self._week_ingredient_ids(week_id, db)
+        confirmed_ids = self._confirmed_ingredient_ids(set(normalized_texts.values()), db)
+
+        results: Dict[int, List[Dict[str, Any]]] = {}
+        for line in distinct_lines.values():
+            # Stage 3: Multi-stage matching + embedding boost
+            row = query_rows[candidate_texts[line.id]]
+            # Parse the quantity once per line, not once per candidate
+            receipt_quantity = self.unit_converter.parse_quantity_unit(line.raw_text)
+            matches = self._multi_stage_matching(
+                candidate_texts[line.id], catalog, fuzzy_scores[row], line, receipt_quantity
+            )
+            if query_matrix is not None and matches:
+                # Blend cosine similarity into confidence. Only this line's
+                # candidates are scored, not the whole catalog
+                alpha = 0.7  # weight for embeddings
+                cols = [ing_cols[m.recipe_ingredient_id] for m in matches]
+                match_sims = np.clip(ing_matrix[cols] @ query_matrix[row], 0.0, 1.0)
+                fuzzy = np.fromiter((m.confidence for m in matches), dtype=np.float64, count=len(matches))
+                blended = np.minimum(1.0, alpha * match_sims + (1 - alpha) * fuzzy)
+                for m, confidence in zip(matches, blended.tolist()):
+                    m.confidence = confidence
+
+            # Stage 3: Context-aware filtering (boost ingredients in current week)
+            matches = self._apply_context_boost(matches, week_ingredient_ids)
+
+            # Stage 4: Learn from previous confirmations
+            matches = self._apply_learning_boost(matches, confirmed_ids[normalized_texts[line.id]])
+
+            # Convert to API format
+            results[line.id] = [
+                {
+                    "recipe_ingredient_id": match.recipe_ingredient_id,
+                    "confidence": match.confidence,
+                    "suggested_qty_consumed": match.suggested_qty_consumed,
+                    "suggested_price": match.suggested_price,
+                    "match_reason": match.match_reason,
+                    "ingredient_name": match.ingredient_name,
+                    "unit_compatible": match.unit_compatible
+                }
+                for match in matches
+            ]
+            logger.info(f"Found {len(results[line.id])} matches for '{line.raw_text}'")
+
+        # Fan results out to duplicate lines
+        return {
+            line.id: results[distinct_lines[self._line_signature(line)].id]
+            for line in receipt_lines
+        }
+
+    def auto_match_high_confidence(self, db: Session, receipt_line: ReceiptLine, planning_week_id: int, commit: bool = True) -> Optional[LineMatch]:
         """Automatically create matches for high-confidence suggestions."""
-        matches = self.find_matches_for_receipt_line(db, receipt_line, planning_week_id)
+        line_matches = self.auto_match_high_confidence_lines(db, [receipt_line], planning_week_id, commit=commit)
+        return line_matches[0] if line_matches else None
+
+    def auto_match_high_confidence_lines(
+        self,
+        db: Session,
+        receipt_lines: List[ReceiptLine],
+        planning_week_id: int,
+        commit: bool = True
+    ) -> List[LineMatch]:
+        """Auto-match every line whose best suggestion clears the exact threshold.
+
+        All matches are committed together; pass commit=False to leave the
+        commit to the caller.
+        """
+        matches_by_line = self.find_matches_for_receipt_lines(db, receipt_lines, planning_week_id)
+
+        line_matches = []
+        for receipt_line in receipt_lines:
+            matches = matches_by_line.get(receipt_line.id)
+            if not matches:
+                continue
 
-        if not matches:
-            return None
+            best_match = matches[0]
+            if best_match['confidence'] < self.exact_threshold:
+                continue
 
-        best_match = matches[0]
-        if best_match['confidence'] >= self.exact_threshold:
             # Create automatic match
-            line_match = LineMatch(
+            line_matches.append(LineMatch(
                 receipt_line_id=receipt_line.id,
                 recipe_ingredient_id=best_match['recipe_ingredient_id'],
                 confidence=best_match['confidence'],
@@ -124,75 +261,168 @@ class AdvancedMatchingService:
                 qty_consumed=best_match['suggested_qty_consumed'],
                 unit=receipt_line.unit or "unit",
                 price_allocated=best_match['suggested_price']
-            )
-
-            db.add(line_match)
-            db.commit()
-            db.refresh(line_match)
+            ))
 
             logger.info(
                 f"Auto-matched receipt line {receipt_line.id} to ingredient "
                 f"{best_match['recipe_ingredient_id']} with confidence {best_match['confidence']}"
             )
 
-            return line_match
+        if line_matches:
+            db.add_all(line_matches)
+            if commit:
+                db.commit()
 
-        return None
+        return line_matches
 
-    def _multi_stage_matching(self, normalized_text: str, ingredients: List[RecipeIngredient], receipt_line: ReceiptLine) -> List[MatchResult]:
-        """Multi-stage matching pipeline."""
-        matches = []
+    def warm_embedding_cache(self, db: Session) -> None:
+        """Embed every ingredient name so matching starts with a warm cache."""
+        if not self.gemini.is_enabled():
+            return
+        ing_names = list(dict.fromkeys(self._ingredient_catalog(db).names))
+        if ing_names and self.gemini.warmup(ing_names):
+            logger.info(f"Warmed embedding cache with {len(ing_names)} ingredient names")
+
+    def _ingredient_catalog(self, db: Session) -> IngredientCatalog:
+        """Ingredients and their normalized names, reloaded when the table changes.
+
+        Changes are detected by (count, max id), so only inserts and deletes
+        are seen; an ingredient whose name or unit is edited in place keeps
+        its old entry until rows are added or removed or the process restarts.
+        """
+        global _catalog
+        version = tuple(db.query(func.count(RecipeIngredient.id), func.max(RecipeIngredient.id)).one())
+        catalog = _catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+
+        rows = db.query(RecipeIngredient.id, RecipeIngredient.name, RecipeIngredient.unit).all()
+        ingredients = [IngredientEntry(*row) for row in rows]
+        names = [self.normalizer.normalize(ing.name) for ing in ingredients]
+        synonyms = [self.normalizer.get_synonyms(name) for name in names]
+        words = [frozenset(name.split()) for name in names]
+        word_index: Dict[str, List[int]] = {}
+        for i, name_words in enumerate(words):
+            for word in name_words:
+                word_index.setdefault(word, []).append(i)
+        catalog = IngredientCatalog(
+            version=version,
+            ingredients=ingredients,
+            names=names,
+            synonyms=synonyms,
+            with_variants=[i for i, syns in enumerate(synonyms) if len(syns) > 1],
+            words=words,
+            word_index=word_index,
+        )
+        with _catalog_lock:
+            _catalog = catalog
+        return catalog
+
+    def _line_signature(self, receipt_line: ReceiptLine) -> Tuple[str, Optional[float], Optional[str], float]:
+        """Fields of a receipt line that its match suggestions depend on."""
+        return (receipt_line.raw_text, receipt_line.qty, receipt_line.unit, receipt_line.line_price)
+
+    def _multi_stage_matching(
+        self,
+        normalized_text: str,
+        catalog: IngredientCatalog,
+        fuzzy_scores: np.ndarray,
+        receipt_line: ReceiptLine,
+        receipt_quantity: Tuple[float, str]
+    ) -> List[MatchResult]:
+        """Multi-stage matching pipeline.
+
+        fuzzy_scores holds each catalog ingredient's fuzz.ratio (0-1) against
+        normalized_text, in catalog order; receipt_quantity is the line's
+        parsed (quantity, unit).
+        """
+        ingredients, ingredient_names = catalog.ingredients, catalog.names
+        matches: Dict[int, MatchResult] = {}
+
+        for i in np.flatnonzero(fuzzy_scores >= self.min_threshold).tolist():
+            ingredient = ingredients[i]
 
-        for ingredient in ingredients:
             # Stage 1: Exact match after normalization
-            normalized_ingredient = self.normalizer.normalize(ingredient.name)
-
-            if normalized_text == normalized_ingredient:
-                match = self._create_match_result(
-                    ingredient, 1.0, receipt_line, "Exact normalized match"
+            if normalized_text == ingredient_names[i]:
+                matches[i] = self._create_match_result(
+                    ingredient, 1.0, receipt_line, receipt_quantity, "Exact normalized match"
                 )
-                matches.append(match)
                 continue
 
             # Stage 2: Fuzzy text similarity
-            fuzzy_score = fuzz.ratio(normalized_text, normalized_ingredient) / 100.0
+            fuzzy_score = float(fuzzy_scores[i])
+            reason = self._get_fuzzy_reason(fuzzy_score)
+            matches[i] = self._create_match_result(
+                ingredient, fuzzy_score, receipt_line, receipt_quantity, reason
+            )
 
-            if fuzzy_score >= self.min_threshold:
-                reason = self._get_fuzzy_reason(fuzzy_score)
-                match = self._create_match_result(
-                    ingredient, fuzzy_score, receipt_line, reason
-                )
-                matches.append(match)
+        # The later stages only consider ingredients that failed the fuzzy
+        # stage, and of those only ones that can reach the threshold: a
+        # partial match needs a shared word, a synonym match a high enough score
+        remaining = fuzzy_scores < self.min_threshold
+        if not remaining.any():
+            return self._sorted_matches(matches)
+
+        text_words = frozenset(normalized_text.split())
+        partial_candidates = {
+            i for word in text_words for i in catalog.word_index.get(word, ())
+        }
+        synonym_scores = self._synonym_scores(normalized_text, catalog, fuzzy_scores)
+        synonym_candidates = np.flatnonzero(synonym_scores >= self.min_threshold).tolist()
+
+        for i in sorted(partial_candidates.union(synonym_candidates)):
+            if not remaining[i]:
                 continue
+            ingredient = ingredients[i]
 
             # Stage 3: Partial matching (word-level)
-            partial_score = self._partial_word_match(normalized_text, normalized_ingredient)
+            partial_score = self._partial_word_match(text_words, catalog.words[i])
 
             if partial_score >= self.min_threshold:
-                match = self._create_match_result(
-                    ingredient, partial_score, receipt_line, "Partial word match"
+                matches[i] = self._create_match_result(
+                    ingredient, partial_score, receipt_line, receipt_quantity, "Partial word match"
                 )
-                matches.append(match)
                 continue
 
             # Stage 4: Synonym matching
-            synonym_score = self._synonym_match(normalized_text, normalized_ingredient)
+            synonym_score = float(synonym_scores[i])
 
             if synonym_score >= self.min_threshold:
-                match = self._create_match_result(
-                    ingredient, synonym_score, receipt_line, "Synonym match"
+                matches[i] = self._create_match_result(
+                    ingredient, synonym_score, receipt_line, receipt_quantity, "Synonym match"
                 )
-                matches.append(match)
 
-        # Sort by confidence
-        matches.sort(key=lambda x: x.confidence, reverse=True)
-        return matches
+        return self._sorted_matches(matches)
 
-    def _create_match_result(self, ingredient: RecipeIngredient, confidence: float, receipt_line: ReceiptLine, reason: str) -> MatchResult:
+    def _sorted_matches(self, matches: Dict[int, MatchResult]) -> List[MatchResult]:
+        """The top MATCH_SUGGESTION_LIMIT matches by descending confidence, ties in ingredient order."""
+        order = sorted(matches)
+        if len(order) > MATCH_SUGGESTION_LIMIT:
+            confidences = np.fromiter(
+                (matches[i].confidence for i in order), dtype=np.float64, count=len(order)
+            )
+            # Partition to the survivors instead of sorting every candidate;
+            # everything tied with the last place is kept for the stable sort
+            kth = np.partition(confidences, -MATCH_SUGGESTION_LIMIT)[-MATCH_SUGGESTION_LIMIT]
+            order = [i for i, keep in zip(order, (confidences >= kth).tolist()) if keep]
+        return sorted(
+            (matches[i] for i in order),
+            key=lambda x: x.confidence,
+            reverse=True
+        )[:MATCH_SUGGESTION_LIMIT]
+
+    def _create_match_result(
+        self,
+        ingredient: IngredientEntry,
+        confidence: float,
+        receipt_line: ReceiptLine,
+        receipt_quantity: Tuple[float, str],
+        reason: str
+    ) -> MatchResult:
         """Create a match result with unit compatibility check."""
 
         # Check unit compatibility
-        receipt_qty, receipt_unit = self.unit_converter.parse_quantity_unit(receipt_line.raw_text)
+        receipt_qty, receipt_unit = receipt_quantity
         unit_compatible = self.unit_converter.are_units_compatible(receipt_unit, ingredient.unit)
 
         # Adjust confidence based on unit compatibility
@@ -224,11 +454,8 @@ class AdvancedMatchingService:
         else:
             return "Low confidence fuzzy match"
 
-    def _partial_word_match(self, text1: str, text2: str) -> float:
+    def _partial_word_match(self, words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
         """Check for partial word matches."""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-
         if not words1 or not words2:
             return 0.0
 
@@ -238,36 +465,49 @@ class AdvancedMatchingService:
 
         return intersection / union if union > 0 else 0.0
 
-    def _synonym_match(self, text1: str, text2: str) -> float:
-        """Check for synonym matches using the normalizer."""
-        synonyms1 = self.normalizer.get_synonyms(text1)
-        synonyms2 = self.normalizer.get_synonyms(text2)
-
-        best_score = 0.0
-        for syn1 in synonyms1:
-            for syn2 in synonyms2:
-                score = fuzz.ratio(syn1, syn2) / 100.0
-                best_score = max(best_score, score)
+    def _synonym_match(self, synonyms1: FrozenSet[str], synonyms2: FrozenSet[str]) -> float:
+        """Best fuzzy ratio (0-1) between any synonym of one text and any of the other."""
+        if synonyms1 & synonyms2:
+            return 1.0
+        return float(process.cdist(list(synonyms1), list(synonyms2), scorer=fuzz.ratio).max()) / 100.0
+
+    def _synonym_scores(self, text: str, catalog: IngredientCatalog, fuzzy_scores: np.ndarray) -> np.ndarray:
+        """Synonym match score of text against every catalog ingredient.
+
+        For an ingredient whose only synonym is its own name this is the best
+        ratio between that name and any synonym of text, scored for the whole
+        catalog in one cdist call; when text has no variants either, that is
+        just its fuzzy score. Scores below the threshold may read as 0.
+        """
+        synonyms = self.normalizer.get_synonyms(text)
+        if len(synonyms) > 1:
+            scores = process.cdist(
+                list(synonyms), catalog.names, scorer=fuzz.ratio, dtype=np.float64, workers=-1
+            ).max(axis=0) / 100.0
+        else:
+            scores = fuzzy_scores.copy()
 
-        return best_score
+        for i in catalog.with_variants:
+            scores[i] = self._synonym_match(synonyms, catalog.synonyms[i])
+        return scores
 
-    def _apply_context_boost(self, matches: List[MatchResult], week_id: int, db: Session) -> List[MatchResult]:
-        """Boost confidence for ingredients in the current planning week."""
+    def _week_ingredient_ids(self, week_id: int, db: Session) -> FrozenSet[int]:
+        """Ids of the ingredients planned for the given week."""
+        cached = _week_ingredient_cache.get(week_id)
+        if cached is not None:
+            return cached
 
-        # Get ingredients that are planned for this week
-        week = db.query(PlanningWeek).filter(PlanningWeek.id == week_id).first()
-        if not week:
-            return matches
+        # Get recipe ingredients for this week in one joined query
+        rows = db.query(RecipeIngredient.id).join(
+            WeekRecipe, WeekRecipe.recipe_id == RecipeIngredient.recipe_id
+        ).filter(WeekRecipe.planning_week_id == week_id).all()
+        week_ingredient_ids = frozenset(ingredient_id for (ingredient_id,) in rows)
 
-        # Get recipe ingredients for this week
-        week_ingredient_ids = set()
-        week_recipes = db.query(WeekRecipe).filter(WeekRecipe.planning_week_id == week_id).all()
+        _week_ingredient_cache.set(week_id, week_ingredient_ids)
+        return week_ingredient_ids
 
-        for week_recipe in week_recipes:
-            recipe_ingredients = db.query(RecipeIngredient).filter(
-                RecipeIngredient.recipe_id == week_recipe.recipe_id
-            ).all()
-            week_ingredient_ids.update(ing.id for ing in recipe_ingredients)
+    def _apply_context_boost(self, matches: List[MatchResult], week_ingredient_ids: FrozenSet[int]) -> List[MatchResult]:
+        """Boost confidence for ingredients in the current planning week."""
 
         # Boost matches for ingredients in this week
         for match in matches:
@@ -277,16 +517,38 @@ class AdvancedMatchingService:
 
         return matches
 
-    def _apply_learning_boost(self, matches: List[MatchResult], normalized_text: str, db: Session) -> List[MatchResult]:
-        """Boost confidence based on previous user confirmations."""
-
-        # Get previous confirmations for similar text
-        confirmations = db.query(UserMatchConfirmation).filter(
-            UserMatchConfirmation.normalized_text == normalized_text,
+    def _confirmed_ingredient_ids(self, normalized_texts: Set[str], db: Session) -> Dict[str, FrozenSet[int]]:
+        """Previously confirmed ingredient ids for each normalized text."""
+        confirmed: Dict[str, FrozenSet[int]] = {}
+        misses = []
+        for text in normalized_texts:
+            cached = _confirmation_cache.get(text)
+            if cached is not None:
+                confirmed[text] = cached
+            else:
+                misses.append(text)
+        if not misses:
+            return confirmed
+
+        # Get previous confirmations for the uncached texts in one query
+        confirmations = db.query(
+            UserMatchConfirmation.normalized_text,
+            UserMatchConfirmation.ingredient_id
+        ).filter(
+            UserMatchConfirmation.normalized_text.in_(misses),
             UserMatchConfirmation.was_correct == True
         ).all()
 
-        confirmed_ingredient_ids = {conf.ingredient_id for conf in confirmations}
+        found: Dict[str, Set[int]] = {text: set() for text in misses}
+        for normalized_text, ingredient_id in confirmations:
+            found[normalized_text].add(ingredient_id)
+        for text, ids in found.items():
+            confirmed[text] = frozenset(ids)
+            _confirmation_cache.set(text, confirmed[text])
+        return confirmed
+
+    def _apply_learning_boost(self, matches: List[MatchResult], confirmed_ingredient_ids: FrozenSet[int]) -> List[MatchResult]:
+        """Boost confidence based on previous user confirmations."""
 
         # Boost matches for previously confirmed ingredients
         for match in matches:
@@ -296,10 +558,23 @@ class AdvancedMatchingService:
 
         return matches
 
-    def confirm_match(self, db: Session, user_id: int, receipt_line_id: int, ingredient_id: int, was_correct: bool) -> None:
-        """Store a user confirmation for learning."""
-
-        receipt_line = db.query(ReceiptLine).filter(ReceiptLine.id == receipt_line_id).first()
+    def confirm_match(
+        self,
+        db: Session,
+        user_id: int,
+        receipt_line_id: int,
+        ingredient_id: int,
+        was_correct: bool,
+        receipt_line: Optional[ReceiptLine] = None,
+        commit: bool = True
+    ) -> None:
+        """Store a user confirmation for learning (pass receipt_line if already loaded).
+
+        Pass commit=False to commit it together with the caller's own changes.
+        """
+
+        if receipt_line is None:
+            receipt_line = db.query(ReceiptLine).filter(ReceiptLine.id == receipt_line_id).first()
         if not receipt_line:
             return
 
@@ -315,6 +590,12 @@ class AdvancedMatchingService:
         )
 
         db.add(confirmation)
-        db.commit()
+        if commit:
+            db.commit()
+
+        # Re-read on next use rather than adding the id: with commit=False the
+        # caller's commit may still fail, and dropping can't serve a phantom boost
+        if was_correct:
+            _confirmation_cache.pop(normalized_text)
 
         logger.info(f"Stored match confirmation: {receipt_line.raw_text} -> ingredient {ingredient_id} ({'correct' if was_correct else 'incorrect'})")
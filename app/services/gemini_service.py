@@ -1,13 +1,168 @@
+import hashlib
+import importlib.util
 import logging
-import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import httpx
+import numpy as np
+from rapidfuzz import fuzz, process
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_EMBED_BATCH_SIZE = 100  # batchEmbedContents request limit
+GEMINI_EMBED_FUZZY_CUTOFF = 95.0  # fuzz.ratio at which a cached text's vector is reused
+GEMINI_MAX_RETRIES = 3
+GEMINI_RETRY_BACKOFF = 1.0  # seconds, doubled on each 429
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at least 1/rps seconds apart."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of embeddings keyed by sha256(model, text).
+
+    Vectors are stored as int8 with a per-vector scale, a quarter of the
+    memory of float32 and far less than lists of Python floats. Texts are
+    kept per model so a near-identical text can reuse a cached vector.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> (int8 vector, scale, model, text)
+        self._data: "OrderedDict[bytes, Tuple[np.ndarray, float, str, str]]" = OrderedDict()
+        self._texts: Dict[str, Dict[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+    @staticmethod
+    def quantize(vec: List[float]) -> Tuple[np.ndarray, float]:
+        v = np.asarray(vec, dtype=np.float32)
+        peak = float(np.abs(v).max()) if v.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        return np.round(v / scale).astype(np.int8), scale
+
+    @staticmethod
+    def dequantize(q: np.ndarray, scale: float) -> np.ndarray:
+        return q.astype(np.float32) * np.float32(scale)
+
+    def _store(self, key: bytes, q: np.ndarray, scale: float, model: str, text: str) -> None:
+        """Insert or refresh an entry; caller holds the lock."""
+        self._data[key] = (q, scale, model, text)
+        self._data.move_to_end(key)
+        self._texts.setdefault(model, {})[key] = text
+        while len(self._data) > self.maxsize:
+            old_key, (_, _, old_model, _) = self._data.popitem(last=False)
+            self._texts[old_model].pop(old_key, None)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            found = []
+            for text in texts:
+                key = self.key(model, text)
+                entry = self._data.get(key)
+                if entry is not None:
+                    self._data.move_to_end(key)
+                found.append(entry)
+        return [self.dequantize(e[0], e[1]) if e is not None else None for e in found]
+
+    def find_similar(self, model: str, texts: List[str], score_cutoff: float) -> Dict[str, np.ndarray]:
+        """Vectors of cached texts within score_cutoff (fuzz.ratio) of each text.
+
+        A hit is also stored under the new text so the next lookup is exact.
+        The fuzzy search runs on a snapshot, outside the lock.
+        """
+        hits: Dict[str, np.ndarray] = {}
+        with self._lock:
+            model_texts = self._texts.get(model)
+            if not model_texts:
+                return hits
+            keys = list(model_texts)
+            choices = list(model_texts.values())
+
+        best_keys = {}
+        for text in texts:
+            best = process.extractOne(text, choices, scorer=fuzz.ratio, score_cutoff=score_cutoff)
+            if best is not None:
+                best_keys[text] = keys[best[2]]
+        if not best_keys:
+            return hits
+
+        with self._lock:
+            for text, best_key in best_keys.items():
+                # Skip matches evicted while the lock was released
+                entry = self._data.get(best_key)
+                if entry is None:
+                    continue
+                q, scale, _, _ = entry
+                self._store(self.key(model, text), q, scale, model, text)
+                hits[text] = self.dequantize(q, scale)
+        return hits
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+        """Store vectors by text and return them as they will be read back."""
+        entries = {text: self.quantize(vec) for text, vec in vectors.items()}
+        with self._lock:
+            for text, (q, scale) in entries.items():
+                self._store(self.key(model, text), q, scale, model, text)
+        return {text: self.dequantize(q, scale) for text, (q, scale) in entries.items()}
+
+
+# Shared by every GeminiService in the process
+_embedding_cache = EmbeddingCache(settings.GEMINI_EMBED_CACHE_SIZE)
+_gemini_inflight = threading.BoundedSemaphore(settings.GEMINI_MAX_INFLIGHT)
+_gemini_rate_limiter = RateLimiter(settings.GEMINI_RPS)
+
+# Overlaps the per-text generateContent calls of normalize_texts; sized to
+# the in-flight cap since more threads would only wait on the semaphore
+_normalize_executor = ThreadPoolExecutor(
+    max_workers=settings.GEMINI_MAX_INFLIGHT,
+    thread_name_prefix="gemini-normalize",
+)
+
+# One keep-alive connection pool for all Gemini calls in the process;
+# HTTP/2 multiplexes them over a single TLS session when h2 is installed
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared Gemini HTTP client, creating it on first use."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=10.0,
+                limits=httpx.Limits(
+                    max_connections=32, max_keepalive_connections=32
+                )
+            )
+        return _http_client
+
 
 class GeminiService:
     """Thin wrapper around Google Gemini APIs for embeddings and text normalization.
@@ -20,43 +175,124 @@ class GeminiService:
         self.api_key = settings.GEMINI_API_KEY
         self.embedding_model = settings.GEMINI_EMBEDDING_MODEL
         self.text_model = settings.GEMINI_TEXT_MODEL
-        self._client = httpx.Client(timeout=10.0)
+        self._client = get_http_client()
 
     def is_enabled(self) -> bool:
         return bool(self.api_key)
 
-    def embed_texts(self, texts: List[str]) -> Optional[List[List[float]]]:
-        """Get embeddings for the given texts. Returns None on error."""
-        if not self.is_enabled():
-            return None
-        try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.embedding_model}:embedContent?key={self.api_key}"
-            vectors: List[List[float]] = []
-            for t in texts:
-                payload = {
-                    "model": self.embedding_model,
-                    "content": {"parts": [{"text": t or ""}]},
-                }
+    def _post(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST under the process-wide concurrency cap and rate limit, backing off on 429."""
+        backoff = GEMINI_RETRY_BACKOFF
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            with _gemini_inflight:
+                _gemini_rate_limiter.acquire()
                 resp = self._client.post(url, json=payload)
-                if resp.status_code != 200:
-                    logger.warning("Gemini embed error %s: %s", resp.status_code, resp.text)
-                    return None
-                data = resp.json()
-                emb = data.get("embedding", {}).get("values")
+            if resp.status_code != 429 or attempt == GEMINI_MAX_RETRIES:
+                return resp
+            logger.info("Gemini rate limited; retrying in %.1fs", backoff)
+            time.sleep(backoff)
+            backoff *= 2
+        return resp
+
+    def _embed_batch(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Embed texts with batchEmbedContents, one request per GEMINI_EMBED_BATCH_SIZE texts."""
+        url = f"{GEMINI_API_BASE}/models/{self.embedding_model}:batchEmbedContents?key={self.api_key}"
+        model = f"models/{self.embedding_model}"
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), GEMINI_EMBED_BATCH_SIZE):
+            chunk = texts[start:start + GEMINI_EMBED_BATCH_SIZE]
+            payload = {
+                "requests": [
+                    {"model": model, "content": {"parts": [{"text": t or ""}]}}
+                    for t in chunk
+                ]
+            }
+            resp = self._post(url, payload)
+            if resp.status_code != 200:
+                logger.warning("Gemini batch embed error %s: %s", resp.status_code, resp.text)
+                return None
+            embeddings = resp.json().get("embeddings") or []
+            if len(embeddings) != len(chunk):
+                return None
+            for e in embeddings:
+                emb = e.get("values")
                 if not emb:
                     return None
                 vectors.append(emb)
-            return vectors
-        except Exception as e:
-            logger.warning("Gemini embed exception: %s", e)
+        return vectors
+
+    def _embed_each(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Embed texts one embedContent request at a time."""
+        url = f"{GEMINI_API_BASE}/models/{self.embedding_model}:embedContent?key={self.api_key}"
+        vectors: List[List[float]] = []
+        for t in texts:
+            payload = {
+                "model": self.embedding_model,
+                "content": {"parts": [{"text": t or ""}]},
+            }
+            resp = self._post(url, payload)
+            if resp.status_code != 200:
+                logger.warning("Gemini embed error %s: %s", resp.status_code, resp.text)
+                return None
+            data = resp.json()
+            emb = data.get("embedding", {}).get("values")
+            if not emb:
+                return None
+            vectors.append(emb)
+        return vectors
+
+    def embed_texts(self, texts: List[str]) -> Optional[List[np.ndarray]]:
+        """Get float32 embeddings for the given texts. Returns None on error.
+
+        Cached embeddings are reused, including those of near-identical texts;
+        only the rest are sent, in batches, falling back to one request per
+        text if batching fails.
+        """
+        if not self.is_enabled():
             return None
+        texts = [t or "" for t in texts]
+        vectors = _embedding_cache.get_many(self.embedding_model, texts)
+
+        misses = list(dict.fromkeys(t for t, vec in zip(texts, vectors) if vec is None))
+        found: Dict[str, np.ndarray] = {}
+        if misses:
+            # Near-identical texts (OCR variants) reuse a cached vector
+            found = _embedding_cache.find_similar(
+                self.embedding_model, misses, GEMINI_EMBED_FUZZY_CUTOFF
+            )
+            misses = [t for t in misses if t not in found]
+        if misses:
+            try:
+                embedded = self._embed_batch(misses)
+                if embedded is None:
+                    embedded = self._embed_each(misses)
+            except Exception as e:
+                logger.warning("Gemini embed exception: %s", e)
+                return None
+            if embedded is None:
+                return None
+            found.update(_embedding_cache.put_many(self.embedding_model, dict(zip(misses, embedded))))
+        if found:
+            vectors = [vec if vec is not None else found[t] for t, vec in zip(texts, vectors)]
+        return vectors
+
+    def warmup(self, texts: List[str]) -> bool:
+        """Embed texts ahead of time so later calls are served from the cache."""
+        return self.embed_texts(texts) is not None
+
+    def normalize_texts(self, raws: List[str]) -> Dict[str, Optional[str]]:
+        """normalize_text for many texts concurrently, keyed by input text."""
+        distinct = list(dict.fromkeys(raws))
+        if len(distinct) <= 1:
+            return {raw: self.normalize_text(raw) for raw in distinct}
+        return dict(zip(distinct, _normalize_executor.map(self.normalize_text, distinct)))
 
     def normalize_text(self, raw: str) -> Optional[str]:
         """Ask Gemini to normalize an item name (optional). Returns None on error."""
         if not self.is_enabled():
             return None
         try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.text_model}:generateContent?key={self.api_key}"
+            url = f"{GEMINI_API_BASE}/models/{self.text_model}:generateContent?key={self.api_key}"
             prompt = (
                 "Normalize the following grocery item name for matching. "
                 "Lowercase, remove brand/promo words, standardize units. "
@@ -65,7 +301,7 @@ class GeminiService:
             payload = {
                 "contents": [{"parts": [{"text": prompt}]}]
             }
-            resp = self._client.post(url, json=payload)
+            resp = self._post(url, payload)
             if resp.status_code != 200:
                 logger.warning("Gemini normalize error %s: %s", resp.status_code, resp.text)
                 return None
@@ -80,13 +316,19 @@ class GeminiService:
             return None
 
 
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    if not a or not b or len(a) != len(b):
+def cosine_similarity(
+    a: Sequence[float],
+    b: Sequence[float],
+    norm_a: Optional[float] = None,
+    norm_b: Optional[float] = None
+) -> float:
+    """Cosine similarity clipped to 0-1; pass norms already known to skip recomputing them."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    if not a.size or not b.size or a.shape != b.shape:
         return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    na = math.sqrt(sum(x * x for x in a))
-    nb = math.sqrt(sum(y * y for y in b))
+    na = float(np.linalg.norm(a)) if norm_a is None else norm_a
+    nb = float(np.linalg.norm(b)) if norm_b is None else norm_b
     if na == 0 or nb == 0:
         return 0.0
-    return max(0.0, min(1.0, dot / (na * nb)))
-
+    return max(0.0, min(1.0, float(np.dot(a, b)) / (na * nb)))
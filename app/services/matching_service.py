@@ -1,13 +1,20 @@
 import logging
+import re
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
 
 from app.models.planning import RecipeIngredient, PlanningWeek, WeekRecipe
 from app.models.receipt import ReceiptLine, LineMatch
 
 logger = logging.getLogger(__name__)
 
+# Common words that don't affect matching, removed only as whole words
+STOP_WORDS_RE = re.compile(
+    r"(?<!\S)(?:organic|fresh|whole|reduced|fat|free|natural)(?!\S)"
+)
+
 
 class MatchingService:
     """Service for matching receipt items to recipe ingredients."""
@@ -26,6 +33,14 @@ class MatchingService:
 
         # Get all recipe ingredients for the planning week
         recipe_ingredients = self._get_week_ingredients(db, planning_week_id)
+        return self._find_matches(receipt_line, recipe_ingredients)
+
+    def _find_matches(
+        self,
+        receipt_line: ReceiptLine,
+        recipe_ingredients: List[RecipeIngredient]
+    ) -> List[Dict[str, Any]]:
+        """Score a receipt line against already loaded recipe ingredients."""
 
         matches = []
         normalized_receipt_name = self._normalize_name(receipt_line.normalized_name or receipt_line.raw_text)
@@ -58,16 +73,33 @@ class MatchingService:
         planning_week_id: int
     ) -> Optional[LineMatch]:
         """Automatically create matches for high-confidence suggestions."""
+        line_matches = self.auto_match_high_confidence_lines(db, [receipt_line], planning_week_id)
+        return line_matches[0] if line_matches else None
 
-        matches = self.find_matches_for_receipt_line(db, receipt_line, planning_week_id)
+    def auto_match_high_confidence_lines(
+        self,
+        db: Session,
+        receipt_lines: List[ReceiptLine],
+        planning_week_id: int
+    ) -> List[LineMatch]:
+        """Auto-match every line whose best suggestion clears the exact threshold.
 
-        if not matches:
-            return None
+        Week ingredients are loaded once and all matches are committed together.
+        """
+        recipe_ingredients = self._get_week_ingredients(db, planning_week_id)
+
+        line_matches = []
+        for receipt_line in receipt_lines:
+            matches = self._find_matches(receipt_line, recipe_ingredients)
+            if not matches:
+                continue
+
+            best_match = matches[0]
+            if best_match['confidence'] < self.exact_match_threshold:
+                continue
 
-        best_match = matches[0]
-        if best_match['confidence'] >= self.exact_match_threshold:
             # Create automatic match
-            line_match = LineMatch(
+            line_matches.append(LineMatch(
                 receipt_line_id=receipt_line.id,
                 recipe_ingredient_id=best_match['recipe_ingredient_id'],
                 confidence=best_match['confidence'],
@@ -75,20 +107,18 @@ class MatchingService:
                 qty_consumed=best_match['suggested_qty_consumed'],
                 unit=receipt_line.unit or "unit",
                 price_allocated=best_match['suggested_price']
-            )
-
-            db.add(line_match)
-            db.commit()
-            db.refresh(line_match)
+            ))
 
             logger.info(
                 f"Auto-matched receipt line {receipt_line.id} to ingredient "
                 f"{best_match['recipe_ingredient_id']} with confidence {best_match['confidence']}"
             )
 
-            return line_match
+        if line_matches:
+            db.add_all(line_matches)
+            db.commit()
 
-        return None
+        return line_matches
 
     def _get_week_ingredients(self, db: Session, planning_week_id: int) -> List[RecipeIngredient]:
         """Get all recipe ingredients for a planning week via WeekRecipe join."""
@@ -99,31 +129,26 @@ class MatchingService:
             .all()
         )
 
-    def _normalize_name(self, name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=50_000)
+    def _normalize_name(name: str) -> str:
         """Normalize ingredient/item names for matching."""
         if not name:
             return ""
 
-        normalized = name.lower().strip()
-
-        # Remove common words that don't affect matching
-        stop_words = ['organic', 'fresh', 'whole', 'reduced', 'fat', 'free', 'natural']
-        words = normalized.split()
-        filtered_words = [word for word in words if word not in stop_words]
-
-        return ' '.join(filtered_words)
+        return ' '.join(STOP_WORDS_RE.sub("", name.lower()).split())
 
     def _calculate_similarity(self, str1: str, str2: str) -> float:
         """Calculate similarity between two strings."""
-        # Use sequence matcher for basic similarity
-        base_similarity = SequenceMatcher(None, str1, str2).ratio()
+        base_similarity = fuzz.ratio(str1, str2) / 100.0
 
         # Boost score for exact word matches
         words1 = set(str1.split())
         words2 = set(str2.split())
 
-        if words1 & words2:  # Has common words
-            word_boost = len(words1 & words2) / max(len(words1), len(words2))
+        common = words1 & words2
+        if common:
+            word_boost = len(common) / max(len(words1), len(words2))
             base_similarity = min(1.0, base_similarity + word_boost * 0.2)
 
         return base_similarity
@@ -1,16 +1,77 @@
+import hashlib
 import logging
+import mimetypes
 from typing import Dict, Any, List, Optional
-import json
 import os
+import re
 import asyncio
 import time
 from datetime import datetime
 import httpx
 import aiofiles
+import orjson
 from decimal import Decimal, InvalidOperation
 
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
 logger = logging.getLogger(__name__)
 
+# Part of the OCR cache key; bump when parsing changes so stale results aren't served
+OCR_CACHE_ENGINE = "tabscanner-v2"
+OCR_HASH_CHUNK_SIZE = 1024 * 1024
+# Sidecar and text files up to this size are read without aiofiles
+SMALL_FILE_MAX_BYTES = 256 * 1024
+
+_WS_RE = re.compile(r"\s+")
+# Typographic apostrophes, quotes and dashes OCR returns, mapped to ASCII
+_OCR_CHAR_FIXES = str.maketrans({
+    "\u2019": "'",
+    "\u201c": '"',
+    "\u201d": '"',
+    "\u2013": "-",
+    "\u2014": "-",
+})
+_PROMO_RE = re.compile(r"\b(bogo|sale|promo|special|club price)\b|\b(x?\d+/?\d+ off)\b")
+_PUNCT_RE = re.compile(r"[^a-z0-9\s]")
+
+# Unit spellings and their standard forms. Alternatives are tried in this
+# order at each position; " g", " kg" and " qty" only match before a space,
+# which is left for the next token
+_UNIT_REPLACEMENTS = {
+    " oz.": " oz",
+    " fl oz": " floz",
+    " fl. oz": " floz",
+    " ounce": " oz",
+    " ounces": " oz",
+    " lbs": " lb",
+    " pound": " lb",
+    " pounds": " lb",
+    " g": " gram",
+    " kg": " kilogram",
+    " qty": "",
+    "%": " percent",
+}
+_SPACE_DELIMITED_UNITS = {" g", " kg", " qty"}
+_UNIT_RE = re.compile("|".join(
+    re.escape(unit) + ("(?= )" if unit in _SPACE_DELIMITED_UNITS else "")
+    for unit in _UNIT_REPLACEMENTS
+))
+_BRAND_WORDS = [
+    "organic", "brand", "select", "signature", "great value", "market pantry",
+    "kirkland", "trader joe's", "trader joes", "whole foods", "365",
+    "vitamin d", "2 percent", "2percent", "fat free", "reduced fat",
+]
+_BRAND_RE = re.compile("|".join(map(re.escape, _BRAND_WORDS)))
+# Composite ("3 x 12 oz"), standard ("2.5 lb") and pack-only ("6 count")
+# quantities in one pattern, scanned once per item
+_QTY_RE = re.compile(
+    r"(?P<c1>\d+(?:\.\d+)?)\s*[x\*]\s*(?P<c2>\d+(?:\.\d+)?)\s*(?P<cu>oz|lb|g|kg|ml|l|pack|ct|gallon)s?\b"
+    r"|(?P<s1>\d+(?:\.\d+)?)\s*(?P<su>gallon|gal|oz|floz|lb|kg|g|mg|ml|l|pack|ct)s?\b"
+    r"|(?P<p1>\d+(?:\.\d+)?)\s*(?:pack|count|ct)\b"
+)
+_UNIT_ALIASES = {"gal": "gallon", "floz": "floz", "ct": "count"}
+
 
 class OCRService:
     """Service for processing receipt images with OCR using Tabscanner API."""
@@ -20,8 +81,9 @@ class OCRService:
         self.api_key = os.getenv("TABSCANNER_API_KEY")
         self.process_endpoint = "https://api.tabscanner.com/api/2/process"
         self.result_endpoint_base = "https://api.tabscanner.com/api/result/"
-        self.max_polling_attempts = 60  # Max 60 seconds of polling
-        self.polling_interval = 1  # Poll every 1 second
+        self.polling_timeout = 60.0  # Max 60 seconds of polling
+        self.polling_initial_delay = 0.15  # First poll soon after upload
+        self.polling_max_delay = 2.0  # Delay grows 1.6x per poll up to this
 
     async def process_receipt_image(self, image_path: str) -> Dict[str, Any]:
         """Process a receipt image and extract structured data using Tabscanner API.
@@ -42,19 +104,26 @@ class OCRService:
             base, ext = os.path.splitext(image_path)
             json_path = image_path if ext == ".json" else f"{base}.json"
             if os.path.exists(json_path):
-                async with aiofiles.open(json_path, "r") as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                return data
+                return orjson.loads(await self._read_file(json_path, "rb"))
 
             # 2) Simple .txt format parsing
             if ext == ".txt" and os.path.exists(image_path):
                 return await self._parse_text_file(image_path)
 
-            # 3) Real Tabscanner API processing
+            # 3) Real Tabscanner API processing, skipped for images seen before
             if self.api_key and ext in ['.jpg', '.jpeg', '.png']:
+                cache_key = f"ocr:{OCR_CACHE_ENGINE}:{await self._file_digest(image_path)}"
+                cached = self._ocr_cache_get(cache_key)
+                if cached is not None:
+                    logger.info(f"Using cached OCR result for: {image_path}")
+                    return cached
+
                 logger.info(f"Processing receipt with Tabscanner API: {image_path}")
-                return await self._process_with_tabscanner(image_path)
+                result = await self._process_with_tabscanner(image_path)
+                # Parse failures come back as fallback data; don't cache those
+                if result.get("metadata", {}).get("ocr_engine") == "tabscanner":
+                    self._ocr_cache_put(cache_key, result)
+                return result
 
             # 4) Fallback deterministic data
             logger.warning(f"No API key configured, using fallback data for: {image_path}")
@@ -64,16 +133,48 @@ class OCRService:
             logger.error(f"OCR processing failed for {image_path}: {e}")
             raise
 
+    async def _read_file(self, path: str, mode: str) -> Any:
+        """Read a whole file; small ones directly, since a thread-pool hop costs more than the read."""
+        if os.path.getsize(path) <= SMALL_FILE_MAX_BYTES:
+            with open(path, mode) as f:
+                return f.read()
+        async with aiofiles.open(path, mode) as f:
+            return await f.read()
+
+    async def _file_digest(self, path: str) -> str:
+        """BLAKE2b digest of a file's content, read in chunks."""
+        digest = hashlib.blake2b(digest_size=16)
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(OCR_HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _ocr_cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached OCR result for a content key, if any."""
+        cached = redis_client.get(key)
+        if not cached:
+            return None
+        try:
+            return orjson.loads(cached)
+        except ValueError:
+            return None
+
+    def _ocr_cache_put(self, key: str, result: Dict[str, Any]) -> None:
+        """Cache an OCR result under its content key."""
+        redis_client.set(key, orjson.dumps(result), ex=settings.OCR_CACHE_TTL)
+
     async def _process_with_tabscanner(self, image_path: str) -> Dict[str, Any]:
         """Process receipt using Tabscanner API."""
         try:
-            # Upload receipt image
-            token = await self._upload_receipt(image_path)
-            if not token:
-                raise ValueError("Failed to upload receipt to Tabscanner")
-
-            # Poll for results
-            result = await self._poll_for_result(token)
+            # One connection pool for the upload and every poll
+            async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0)) as client:
+                # Upload receipt image
+                token = await self._upload_receipt(client, image_path)
+                if not token:
+                    raise ValueError("Failed to upload receipt to Tabscanner")
+
+                # Poll for results
+                result = await self._poll_for_result(client, token)
             if not result:
                 raise ValueError("Failed to get OCR result from Tabscanner")
 
@@ -84,62 +185,70 @@ class OCRService:
             logger.error(f"Tabscanner processing failed: {e}")
             raise
 
-    async def _upload_receipt(self, image_path: str) -> Optional[str]:
+    async def _upload_receipt(self, client: httpx.AsyncClient, image_path: str) -> Optional[str]:
         """Upload receipt image to Tabscanner and get token."""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                async with aiofiles.open(image_path, 'rb') as f:
-                    file_content = await f.read()
-
-                files = {"file": (os.path.basename(image_path), file_content, "image/jpeg")}
-                headers = {"apikey": self.api_key}
+            content_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+            headers = {"apikey": self.api_key}
 
+            # httpx streams the open file into the multipart body in chunks
+            with open(image_path, 'rb') as f:
+                files = {"file": (os.path.basename(image_path), f, content_type)}
                 response = await client.post(
                     self.process_endpoint,
                     headers=headers,
                     files=files
                 )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("token")
-                else:
-                    logger.error(f"Upload failed: {response.status_code} - {response.text}")
-                    return None
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                return data.get("token")
+            else:
+                logger.error(f"Upload failed: {response.status_code} - {response.text}")
+                return None
 
         except Exception as e:
             logger.error(f"Failed to upload receipt: {e}")
             return None
 
-    async def _poll_for_result(self, token: str) -> Optional[Dict[str, Any]]:
+    async def _poll_for_result(self, client: httpx.AsyncClient, token: str) -> Optional[Dict[str, Any]]:
         """Poll Tabscanner for processing results."""
         polling_url = f"{self.result_endpoint_base}{token}"
         headers = {"apikey": self.api_key}
 
-        for attempt in range(self.max_polling_attempts):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.polling_timeout
+        delay = self.polling_initial_delay
+        attempt = 0
+
+        while True:
+            attempt += 1
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(polling_url, headers=headers)
-
-                    if response.status_code == 200:
-                        result_data = response.json()
-                        status = result_data.get("status")
-
-                        if status == "done":
-                            return result_data.get("result")
-                        elif status == "pending":
-                            logger.info(f"OCR processing in progress... (attempt {attempt + 1})")
-                            await asyncio.sleep(self.polling_interval)
-                        else:
-                            logger.error(f"OCR processing failed with status: {status}")
-                            return None
+                response = await client.get(polling_url, headers=headers, timeout=10.0)
+
+                if response.status_code == 200:
+                    result_data = orjson.loads(response.content)
+                    status = result_data.get("status")
+
+                    if status == "done":
+                        return result_data.get("result")
+                    elif status == "pending":
+                        logger.info(f"OCR processing in progress... (attempt {attempt})")
                     else:
-                        logger.error(f"Polling failed: {response.status_code} - {response.text}")
+                        logger.error(f"OCR processing failed with status: {status}")
                         return None
+                else:
+                    logger.error(f"Polling failed: {response.status_code} - {response.text}")
+                    return None
 
             except Exception as e:
-                logger.error(f"Polling attempt {attempt + 1} failed: {e}")
-                await asyncio.sleep(self.polling_interval)
+                logger.error(f"Polling attempt {attempt} failed: {e}")
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 1.6, self.polling_max_delay)
 
         logger.error("OCR processing timed out")
         return None
@@ -252,16 +361,13 @@ class OCRService:
             return ""
 
         # Remove common OCR artifacts
-        name = name.replace("'", "'")  # Fix apostrophes
-        name = name.replace(""", '"').replace(""", '"')  # Fix quotes
-        name = name.replace("–", "-").replace("—", "-")  # Fix dashes
+        name = name.translate(_OCR_CHAR_FIXES)  # Fix apostrophes, quotes and dashes
 
         # Remove leading/trailing punctuation that doesn't belong
         name = name.strip(" .,;:-_")
 
         # Remove multiple spaces
-        import re
-        name = re.sub(r'\s+', ' ', name)
+        name = _WS_RE.sub(' ', name)
 
         return name
 
@@ -281,41 +387,41 @@ class OCRService:
         """Parse simple .txt format receipts."""
         items: List[Dict[str, Any]] = []
 
-        async with aiofiles.open(image_path, "r") as f:
-            async for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+        content = await self._read_file(image_path, "r")
+        for line in content.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
 
-                qty, unit = self.extract_quantity_and_unit(line)
-                unit_price = None
-                total_price = None
-
-                # Try to parse prices with simple patterns
-                try:
-                    if "@" in line and "=" in line:
-                        after_at = line.split("@", 1)[1]
-                        left_price = after_at.split("=", 1)[0].strip()
-                        unit_price = float(left_price.split()[0])
-                        right_total = after_at.split("=", 1)[1].strip()
-                        total_price = float(right_total.split()[0])
-                    else:
-                        # Try last number as total
-                        tokens = [t for t in line.replace("=", " ").split() if t]
-                        floats = [float(t) for t in tokens if t.replace('.', '', 1).isdigit()]
-                        if floats:
-                            total_price = floats[-1]
-                except Exception:
-                    pass
+            qty, unit = self.extract_quantity_and_unit(line)
+            unit_price = None
+            total_price = None
 
-                items.append({
-                    "name": line,
-                    "quantity": qty,
-                    "unit": unit,
-                    "unit_price": unit_price,
-                    "total_price": total_price if total_price is not None else unit_price or 0.0,
-                    "confidence": 0.75,
-                })
+            # Try to parse prices with simple patterns
+            try:
+                if "@" in line and "=" in line:
+                    after_at = line.split("@", 1)[1]
+                    left_price = after_at.split("=", 1)[0].strip()
+                    unit_price = float(left_price.split()[0])
+                    right_total = after_at.split("=", 1)[1].strip()
+                    total_price = float(right_total.split()[0])
+                else:
+                    # Try last number as total
+                    tokens = [t for t in line.replace("=", " ").split() if t]
+                    floats = [float(t) for t in tokens if t.replace('.', '', 1).isdigit()]
+                    if floats:
+                        total_price = floats[-1]
+            except Exception:
+                pass
+
+            items.append({
+                "name": line,
+                "quantity": qty,
+                "unit": unit,
+                "unit_price": unit_price,
+                "total_price": total_price if total_price is not None else unit_price or 0.0,
+                "confidence": 0.75,
+            })
 
         return {
             "store_name": "Text Import",
@@ -373,50 +479,25 @@ class OCRService:
         - Drop common brand words and descriptors
         - Collapse extra spaces
         """
-        import re
-
         if not raw_name:
             return ""
 
         text = raw_name.lower().strip()
 
         # Remove promotional patterns
-        promo_patterns = [r"\b(bogo|sale|promo|special|club price)\b", r"\b(x?\d+/?\d+ off)\b"]
-        for pat in promo_patterns:
-            text = re.sub(pat, " ", text)
+        text = _PROMO_RE.sub(" ", text)
 
         # Standardize units/abbreviations
-        replacements = {
-            " oz.": " oz",
-            " fl oz": " floz",
-            " fl. oz": " floz",
-            " ounce": " oz",
-            " ounces": " oz",
-            " lbs": " lb",
-            " pound": " lb",
-            " pounds": " lb",
-            " g ": " gram ",
-            " kg ": " kilogram ",
-            " qty ": " ",
-            "%": " percent",
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
+        text = _UNIT_RE.sub(lambda m: _UNIT_REPLACEMENTS[m.group(0)], text)
 
         # Remove brand names/descriptors (lightweight list)
-        brand_words = [
-            "organic", "brand", "select", "signature", "great value", "market pantry",
-            "kirkland", "trader joe's", "trader joes", "whole foods", "365",
-            "vitamin d", "2 percent", "2percent", "fat free", "reduced fat",
-        ]
-        for w in brand_words:
-            text = text.replace(w, " ")
+        text = _BRAND_RE.sub(" ", text)
 
         # Remove punctuation except alphanumerics and space
-        text = re.sub(r"[^a-z0-9\s]", " ", text)
+        text = _PUNCT_RE.sub(" ", text)
 
         # Collapse whitespace
-        text = re.sub(r"\s+", " ", text)
+        text = _WS_RE.sub(" ", text)
 
         return text.strip()
 
@@ -427,35 +508,29 @@ class OCRService:
         - "2.5 lb", "1 gallon", "6 pack", "12 oz", "3 x 12 oz"
         Returns (quantity, unit) or (1.0, "unit") if not found.
         """
-        import re
-
         if not item_text:
             return 1.0, "unit"
 
         text = item_text.lower()
 
-        # Try composite like "3 x 12 oz" => quantity 12, unit oz (assume overall qty is 12 oz)
-        m = re.search(r"(\d+(?:\.\d+)?)\s*[x\*]\s*(\d+(?:\.\d+)?)\s*(oz|lb|g|kg|ml|l|pack|ct|gallon)s?\b", text)
-        if m:
-            count = float(m.group(1))
-            qty = float(m.group(2))
-            unit = m.group(3)
-            return qty, unit
-
-        # Standard quantity+unit
-        m = re.search(r"(\d+(?:\.\d+)?)\s*(gallon|gal|oz|floz|lb|kg|g|mg|ml|l|pack|ct)s?\b", text)
-        if m:
-            qty = float(m.group(1))
-            unit = m.group(2)
-            # Normalize some units
-            unit_map = {"gal": "gallon", "floz": "floz", "ct": "count"}
-            unit = unit_map.get(unit, unit)
-            return qty, unit
-
-        # Pack only
-        m = re.search(r"(\d+(?:\.\d+)?)\s*(pack|count|ct)\b", text)
-        if m:
-            return float(m.group(1)), "count"
+        # A composite match anywhere wins, then the first standard one, then
+        # the first pack-only one
+        standard = pack = None
+        for m in _QTY_RE.finditer(text):
+            if m.group("cu"):
+                # "3 x 12 oz" => quantity 12, unit oz (assume overall qty is 12 oz)
+                return float(m.group("c2")), m.group("cu")
+            if m.group("su"):
+                standard = standard or m
+            else:
+                pack = pack or m
+
+        if standard:
+            unit = standard.group("su")
+            return float(standard.group("s1")), _UNIT_ALIASES.get(unit, unit)
+
+        if pack:
+            return float(pack.group("p1")), "count"
 
         # Fallback
         return 1.0, "unit"
@@ -1,6 +1,8 @@
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List
 import httpx
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -9,54 +11,100 @@ from app.models.settlement import SplitwiseLink, Settlement
 
 logger = logging.getLogger(__name__)
 
+# Transient failures (connection errors, 429, 5xx) are retried with
+# exponential backoff on calls that are safe to repeat
+SPLITWISE_MAX_RETRIES = 3
+SPLITWISE_RETRY_BACKOFF = 0.5
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# One keep-alive connection pool for all Splitwise calls in the process
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared Splitwise HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared Splitwise HTTP client (on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class SplitwiseService:
     """Service for integrating with Splitwise API."""
 
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or get_http_client()
         self.base_url = "https://secure.splitwise.com/api/v3.0"
         self.client_id = settings.SPLITWISE_CLIENT_ID
         self.client_secret = settings.SPLITWISE_CLIENT_SECRET
 
+    async def _request_with_retry(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, backing off on transient failures."""
+        backoff = SPLITWISE_RETRY_BACKOFF
+        for attempt in range(SPLITWISE_MAX_RETRIES + 1):
+            last_attempt = attempt == SPLITWISE_MAX_RETRIES
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                    return response
+            logger.info("Splitwise request failed; retrying in %.1fs", backoff)
+            await asyncio.sleep(backoff)
+            backoff *= 2
+
     async def exchange_code_for_tokens(self, code: str) -> Dict[str, Any]:
         """Exchange authorization code for access tokens."""
         if not self.client_id or not self.client_secret:
             raise ValueError("Splitwise credentials not configured")
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://secure.splitwise.com/oauth/token",
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": settings.SPLITWISE_REDIRECT_URI,
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                }
-            )
+        response = await self._request_with_retry(
+            "POST",
+            "https://secure.splitwise.com/oauth/token",
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": settings.SPLITWISE_REDIRECT_URI,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+        )
 
-            if response.status_code != 200:
-                logger.error(f"Failed to exchange code for tokens: {response.text}")
-                raise Exception("Failed to exchange authorization code")
+        if response.status_code != 200:
+            logger.error(f"Failed to exchange code for tokens: {response.text}")
+            raise Exception("Failed to exchange authorization code")
 
-            return response.json()
+        return response.json()
 
     async def get_current_user(self, access_token: str) -> Dict[str, Any]:
         """Get current user information from Splitwise."""
         headers = {"Authorization": f"Bearer {access_token}"}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/get_current_user",
-                headers=headers
-            )
+        response = await self._request_with_retry(
+            "GET",
+            f"{self.base_url}/get_current_user",
+            headers=headers
+        )
 
-            if response.status_code != 200:
-                logger.error(f"Failed to get current user: {response.text}")
-                raise Exception("Failed to get user information")
+        if response.status_code != 200:
+            logger.error(f"Failed to get current user: {response.text}")
+            raise Exception("Failed to get user information")
 
-            data = response.json()
-            return data.get("user", {})
+        data = response.json()
+        return data.get("user", {})
 
     async def create_expense(
         self,
@@ -76,18 +124,18 @@ class SplitwiseService:
             "users": users
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/create_expense",
-                headers=headers,
-                json=expense_data
-            )
+        # Not retried: a repeated POST could create the expense twice
+        response = await self.client.post(
+            f"{self.base_url}/create_expense",
+            headers=headers,
+            json=expense_data
+        )
 
-            if response.status_code not in [200, 201]:
-                logger.error(f"Failed to create expense: {response.text}")
-                raise Exception("Failed to create expense")
+        if response.status_code not in [200, 201]:
+            logger.error(f"Failed to create expense: {response.text}")
+            raise Exception("Failed to create expense")
 
-            return response.json()
+        return response.json()
 
     async def sync_settlements_to_splitwise(
         self,
@@ -97,8 +145,15 @@ class SplitwiseService:
     ) -> bool:
         """Sync week settlements to Splitwise."""
         try:
-            # Get settlements for the week
-            settlements = db.query(Settlement).filter(
+            # Get settlements for the week, each with its payer's total summed in SQL
+            settlements = db.query(
+                Settlement.payer_id,
+                Settlement.payee_id,
+                Settlement.amount,
+                func.sum(Settlement.amount).over(
+                    partition_by=Settlement.payer_id
+                ).label("payer_total")
+            ).filter(
                 Settlement.planning_week_id == planning_week_id
             ).all()
 
@@ -114,44 +169,63 @@ class SplitwiseService:
                     expenses_by_payer[payer_id] = []
                 expenses_by_payer[payer_id].append(settlement)
 
-            # Create Splitwise expenses for each payer
+            users_by_id = {u.id: u for u in household_users}
+
+            # Get the household's Splitwise links (payers and payees) in one query
+            links_by_user_id = {
+                link.user_id: link
+                for link in db.query(SplitwiseLink).filter(
+                    SplitwiseLink.user_id.in_(list(users_by_id))
+                ).all()
+            } if users_by_id else {}
+
+            # Create Splitwise expenses for each payer, all requests in flight at once
+            expense_requests = []
             for payer_id, payer_settlements in expenses_by_payer.items():
-                payer = next((u for u in household_users if u.id == payer_id), None)
-                if not payer:
+                if payer_id not in users_by_id:
                     continue
 
-                # Get payer's Splitwise link
-                splitwise_link = db.query(SplitwiseLink).filter(
-                    SplitwiseLink.user_id == payer_id
-                ).first()
+                splitwise_link = links_by_user_id.get(payer_id)
 
                 if not splitwise_link:
                     logger.warning(f"No Splitwise link for user {payer_id}")
                     continue
 
-                # Calculate total amount and prepare user shares
-                total_amount = sum(s.amount for s in payer_settlements)
+                # Prepare user shares
+                total_amount = payer_settlements[0].payer_total
                 splitwise_users = self._prepare_splitwise_users(
-                    household_users, payer_settlements
+                    links_by_user_id, payer_settlements
                 )
 
                 # Create expense in Splitwise
                 expense_description = f"MealSplit - Week {planning_week_id}"
                 tokens = splitwise_link.oauth_tokens
 
-                await self.create_expense(
+                expense_requests.append((payer_id, total_amount, dict(
                     access_token=tokens.get("access_token"),
                     description=expense_description,
                     cost=total_amount,
                     currency="USD",
                     users=splitwise_users
-                )
+                )))
 
-                logger.info(
-                    f"Synced ${total_amount} expense to Splitwise for user {payer_id}"
-                )
+            results = await asyncio.gather(
+                *(self.create_expense(**expense) for _, _, expense in expense_requests),
+                return_exceptions=True
+            )
+
+            # One payer's failure doesn't undo the expenses created for the others
+            synced = True
+            for (payer_id, total_amount, _), result in zip(expense_requests, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to sync expense to Splitwise for user {payer_id}: {result}")
+                    synced = False
+                else:
+                    logger.info(
+                        f"Synced ${total_amount} expense to Splitwise for user {payer_id}"
+                    )
 
-            return True
+            return synced
 
         except Exception as e:
             logger.error(f"Failed to sync settlements to Splitwise: {e}")
@@ -159,10 +233,10 @@ class SplitwiseService:
 
     def _prepare_splitwise_users(
         self,
-        household_users: List[User],
-        settlements: List[Settlement]
+        links_by_user_id: Dict[int, SplitwiseLink],
+        settlements: List[Any]
     ) -> List[Dict[str, Any]]:
-        """Prepare user data for Splitwise expense creation."""
+        """Prepare user data for Splitwise expense creation from settlement rows."""
         users = []
 
         # Create user entry for each person involved in settlements
@@ -180,10 +254,10 @@ class SplitwiseService:
 
         # Convert to Splitwise format
         for user_id, amounts in user_amounts.items():
-            user = next((u for u in household_users if u.id == user_id), None)
-            if user and user.splitwise_link:
+            splitwise_link = links_by_user_id.get(user_id)
+            if splitwise_link:
                 users.append({
-                    "user_id": user.splitwise_link.splitwise_user_id,
+                    "user_id": splitwise_link.splitwise_user_id,
                     "paid_share": str(amounts["paid"]),
                     "owed_share": str(amounts["owed"])
                 })
@@ -1,5 +1,6 @@
 import re
-from typing import List, Set
+from functools import lru_cache
+from typing import FrozenSet, Set
 
 
 class TextNormalizer:
@@ -71,7 +72,14 @@ class TextNormalizer:
         ]
 
     def normalize(self, text: str) -> str:
-        """Full normalization pipeline for grocery item text."""
+        """Full normalization pipeline for grocery item text.
+
+        Results are memoized per process; every instance uses the same word lists.
+        """
+        return _normalize_cached(text)
+
+    def _normalize(self, text: str) -> str:
+        """Run the normalization pipeline without the cache."""
         if not text:
             return ""
 
@@ -186,28 +194,42 @@ class TextNormalizer:
 
         return " ".join(words)
 
-    def get_synonyms(self, text: str) -> List[str]:
-        """Generate common synonyms for ingredient matching."""
-        synonyms = [text]
-
-        # Common UK/US variations
-        uk_us_variations = {
-            "courgette": ["zucchini"],
-            "aubergine": ["eggplant"],
-            "mange tout": ["snow peas", "snap peas"],
-            "rocket": ["arugula"],
-            "coriander": ["cilantro"],
-            "spring onion": ["scallion", "green onion"],
-            "swede": ["rutabaga"],
-            "turnip": ["neep"],
-        }
+    def get_synonyms(self, text: str) -> FrozenSet[str]:
+        """Generate common synonyms for ingredient matching (memoized per process)."""
+        return _synonyms_cached(text)
+
+
+# Common UK/US variations
+UK_US_VARIATIONS = {
+    "courgette": ["zucchini"],
+    "aubergine": ["eggplant"],
+    "mange tout": ["snow peas", "snap peas"],
+    "rocket": ["arugula"],
+    "coriander": ["cilantro"],
+    "spring onion": ["scallion", "green onion"],
+    "swede": ["rutabaga"],
+    "turnip": ["neep"],
+}
+
+
+@lru_cache(maxsize=20_000)
+def _synonyms_cached(text: str) -> FrozenSet[str]:
+    synonyms = [text]
+
+    # Check for variations
+    for uk_term, us_terms in UK_US_VARIATIONS.items():
+        if uk_term in text:
+            synonyms.extend([text.replace(uk_term, us_term) for us_term in us_terms])
+        for us_term in us_terms:
+            if us_term in text:
+                synonyms.append(text.replace(us_term, uk_term))
+
+    return frozenset(synonyms)
+
+
+_shared_normalizer = TextNormalizer()
 
-        # Check for variations
-        for uk_term, us_terms in uk_us_variations.items():
-            if uk_term in text:
-                synonyms.extend([text.replace(uk_term, us_term) for us_term in us_terms])
-            for us_term in us_terms:
-                if us_term in text:
-                    synonyms.append(text.replace(us_term, uk_term))
 
-        return list(set(synonyms))  # Remove duplicates
\ No newline at end of file
+@lru_cache(maxsize=100_000)
+def _normalize_cached(text: str) -> str:
+    return _shared_normalizer._normalize(text)
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Dict, List
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
@@ -10,6 +10,10 @@ from app.services.matching_service import MatchingService
 
 logger = logging.getLogger(__name__)
 
+# Durable feed of matching completions; consumers read it with a group so
+# results aren't lost while none is connected (pub/sub would drop them)
+MATCHING_RESULTS_STREAM = "receipt_matching"
+
 
 class MatchingWorker:
     """Background worker for matching receipt items to recipe ingredients."""
@@ -60,27 +64,12 @@ class MatchingWorker:
                 logger.info(f"No receipt lines found for receipt {receipt_id}")
                 return True
 
-            # Process each receipt line
-            matched_count = 0
+            # Match all lines, committing once for the whole receipt
             total_lines = len(receipt_lines)
-
-            for receipt_line in receipt_lines:
-                try:
-                    # Attempt automatic matching
-                    match = self.matching_service.auto_match_high_confidence(
-                        db, receipt_line, planning_week_id
-                    )
-
-                    if match:
-                        matched_count += 1
-                        logger.info(
-                            f"Auto-matched receipt line {receipt_line.id} "
-                            f"with confidence {match.confidence}"
-                        )
-
-                except Exception as e:
-                    logger.error(f"Failed to process receipt line {receipt_line.id}: {e}")
-                    continue
+            line_matches = self.matching_service.auto_match_high_confidence_lines(
+                db, receipt_lines, planning_week_id
+            )
+            matched_count = len(line_matches)
 
             # Publish matching results
             await self._publish_matching_results(
@@ -122,6 +111,7 @@ class MatchingWorker:
             ).all()
 
             suggestions_generated = 0
+            suggestions_by_line = {}
 
             for receipt_line in unmatched_lines:
                 try:
@@ -132,16 +122,15 @@ class MatchingWorker:
 
                     if suggestions:
                         suggestions_generated += len(suggestions)
-
-                        # Store suggestions in Redis for frontend retrieval
-                        await self._store_match_suggestions(
-                            receipt_line.id, planning_week_id, suggestions
-                        )
+                        suggestions_by_line[receipt_line.id] = suggestions
 
                 except Exception as e:
                     logger.error(f"Failed to generate suggestions for line {receipt_line.id}: {e}")
                     continue
 
+            # Store suggestions in Redis for frontend retrieval
+            await self._store_match_suggestions(planning_week_id, suggestions_by_line)
+
             logger.info(
                 f"Generated {suggestions_generated} match suggestions "
                 f"for planning week {planning_week_id}"
@@ -174,20 +163,25 @@ class MatchingWorker:
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
 
-        channel = f"receipt:{receipt_id}:matching"
-        redis_client.publish(channel, str(message))
+        redis_client.xadd(MATCHING_RESULTS_STREAM, message)
 
     async def _store_match_suggestions(
         self,
-        receipt_line_id: int,
         planning_week_id: int,
-        suggestions: List[dict]
+        suggestions_by_line: Dict[int, List[dict]]
     ):
         """Store match suggestions in Redis for frontend retrieval."""
-        key = f"match_suggestions:{receipt_line_id}:{planning_week_id}"
-
-        # Store suggestions for 24 hours
-        redis_client.set(key, str(suggestions), ex=86400)
+        if not suggestions_by_line:
+            return
+
+        # Store suggestions for 24 hours, all lines in one round trip
+        redis_client.set_many(
+            {
+                f"match_suggestions:{receipt_line_id}:{planning_week_id}": str(suggestions)
+                for receipt_line_id, suggestions in suggestions_by_line.items()
+            },
+            ex=86400
+        )
 
     async def reprocess_week_matching(self, planning_week_id: int) -> bool:
         """Reprocess matching for all receipts in a planning week."""
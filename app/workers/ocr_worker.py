@@ -1,8 +1,9 @@
 import logging
 import os
-import json
+import orjson
 from typing import Dict, Any
 from datetime import datetime, timezone
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
@@ -50,8 +51,8 @@ class OCRWorker:
             os.makedirs(ocr_dir, exist_ok=True)
             ocr_path = os.path.join(ocr_dir, f"{receipt_id}.json")
             try:
-                with open(ocr_path, "w") as jf:
-                    json.dump(ocr_result, jf)
+                with open(ocr_path, "wb") as jf:
+                    jf.write(orjson.dumps(ocr_result))
                 receipt.ocr_json_ref = ocr_path
             except Exception as e:
                 logger.warning(f"Failed to persist OCR JSON for receipt {receipt_id}: {e}")
@@ -70,6 +71,12 @@ class OCRWorker:
                 )
                 db.add(receipt_line)
 
+            # Store the line total so listings don't have to aggregate lines
+            db.flush()
+            receipt.total_amount = db.query(
+                func.coalesce(func.sum(ReceiptLine.line_price), 0.0)
+            ).filter(ReceiptLine.receipt_id == receipt_id).scalar()
+
             # Update status to completed
             receipt.status = "completed"
             db.commit()
@@ -131,8 +138,8 @@ class OCRWorker:
             db.commit()
 
             # Queue for reprocessing
-            # In a real implementation, this would use a job queue like Celery
-            # celery_app.send_task("process_receipt", args=[receipt_id, receipt.image_ref])
+            from app.workers.tasks import ocr_process_receipt
+            ocr_process_receipt.delay(receipt_id, receipt.image_ref)
 
             return True
 
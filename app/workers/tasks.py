@@ -0,0 +1,24 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.celery_app import celery_app
+from app.workers.ocr_worker import OCRWorker
+
+logger = logging.getLogger(__name__)
+
+OCR_MAX_RETRIES = 3
+
+
+@celery_app.task(name="ocr_process_receipt", bind=True, max_retries=OCR_MAX_RETRIES)
+def ocr_process_receipt(self, receipt_id: int, image_path: str) -> None:
+    """Run OCR for an uploaded receipt in a Celery worker process."""
+    if not asyncio.run(OCRWorker().process_receipt(receipt_id, image_path)):
+        logger.warning(f"OCR failed for receipt {receipt_id} (attempt {self.request.retries + 1})")
+        raise self.retry(countdown=30 * 2 ** self.request.retries)
+
+
+async def enqueue_receipt_processing(receipt_id: int, image_path: str) -> None:
+    """Queue OCR for a receipt without blocking the event loop on the broker."""
+    await run_in_threadpool(ocr_process_receipt.delay, receipt_id, image_path)